@@ -3,7 +3,10 @@ import json
 import re
 import subprocess
 import tempfile
+import threading
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
@@ -13,16 +16,32 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import (TimeoutException, 
                                       NoSuchElementException,
-                                      StaleElementReferenceException)
-import groq
-import openai
-import base64
-from io import BytesIO
-from PIL import Image
+                                      StaleElementReferenceException,
+                                      WebDriverException)
 import argparse
+import importlib
 import logging
+from logging.handlers import RotatingFileHandler
 from datetime import datetime
-from jsonschema import validate, ValidationError
+from dom_snapshot import take_dom_snapshot
+from html_compactor import HTMLCompactor, count_tokens
+from llm_cache import LLMResponseCache
+from llm_usage import LLMUsageTracker, response_usage
+from llm_scheduler import LLMRequestScheduler
+from llm_router import API_KEY_ENV, LLMRouter
+from llm_local import LocalChatModel
+from structured_output import StructuredOutputError, parse_structured
+from execution_pool import ScriptExecutionPool
+from browser_pool import SHIM_DIR, BrowserPool
+from url_extract import URLExtractor
+from pipeline import PagePipeline
+from navigation_watcher import NavigationWatcher, enable_navigation_events
+from page_fingerprint import PageFingerprintStore, page_fingerprint
+from screenshots import ScreenshotStore, prepare_for_llm, to_base64
+from result_sink import JSONLResultSink, summarize_results
+from results_store import ResultsStore
+from inprocess_runner import InProcessRunner
+from log_queue import LazyJSON, start_queue_logging, stop_queue_logging
 #from parse_llm_code import extract_first_code
 #from tenacity import retry, stop_after_attempt, wait_fixed, wait_exponential
 
@@ -72,6 +91,97 @@ AUTH_DATA_SCHEMA = {
     }
 }
 
+# Schemas for structured LLM responses; deliberately lenient about optional keys
+PAGE_ANALYSIS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "auth_requirements": {
+            "type": "object",
+            "properties": {
+                "auth_required": {"type": "boolean"},
+                "auth_type": {"type": "string"},
+                "auth_fields": {"type": "array", "items": {"type": "object"}}
+            }
+        },
+        "contact_form_fields": {"type": "array", "items": {"type": "object"}},
+        "main_content": {"type": "string"},
+        "key_actions": {"type": "array"},
+        "content_hierarchy": {"type": "object"},
+        "interactive_patterns": {"type": "object"},
+        "security_indicators": {"type": "array"}
+    }
+}
+
+TEST_CASES_SCHEMA = {
+    "type": "object",
+    "required": ["test_cases"],
+    "properties": {
+        "test_cases": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "required": ["name", "steps"],
+                "properties": {
+                    "name": {"type": "string"},
+                    "type": {"type": "string"},
+                    "steps": {"type": "array", "items": {"type": "string"}},
+                    "selectors": {"type": "object"},
+                    "validation": {"type": "string"},
+                    "test_data": {"type": "object"}
+                }
+            }
+        }
+    }
+}
+
+AUTH_SELECTORS_SCHEMA = {
+    "type": "object",
+    "required": ["username_selector", "password_selector", "submit_selector"],
+    "properties": {
+        "username_selector": {"type": "string"},
+        "password_selector": {"type": "string"},
+        "submit_selector": {"type": "string"},
+        "auth_type": {"type": "string"},
+        "additional_fields": {
+            "type": "object",
+            "additionalProperties": {
+                "type": "object",
+                "required": ["selector"],
+                "properties": {
+                    "selector": {"type": "string"},
+                    "type": {"type": "string"}
+                }
+            }
+        }
+    }
+}
+
+REQUIRES_AUTH_SCHEMA = {
+    "type": "object",
+    "required": ["requires_auth"],
+    "properties": {
+        "requires_auth": {"type": "boolean"}
+    }
+}
+
+SELENIUM_SYSTEM_PROMPT = """You are a senior Selenium automation engineer specializing in creating robust, reliable test scripts for Selenium 4.15.2. Generate executable Selenium code using provided selectors. Output ONLY valid Python code in markdown blocks. You write code that:
+                        - Uses best practices for element selection
+                        - Uses the correct WebDriver initialization pattern for Selenium 4.15.2
+                        - Waits for all JavaScript and AJAX on the page to load before starting any test steps
+                        - For CAPTCHA-protected pages:
+                            - Detect CAPTCHA elements using common selectors
+                            - Pause execution for manual solving when CAPTCHA is present
+                            - Add clear console instructions for user intervention
+                        - Implements proper waits and synchronization
+                        - Handles errors gracefully with retries
+                        - Includes detailed logging and reporting
+                        - Is specific to the website being tested, not generic"""
+
+# Separates the scripts of a batched generation response
+SCRIPT_DELIMITER = "### SCRIPT {index} ###"
+SCRIPT_DELIMITER_RE = re.compile(r"^\s*### SCRIPT (?P<index>\d+) ###\s*$(?P<body>.*?)(?=^\s*### SCRIPT \d+ ###\s*$|\Z)",
+                                 re.MULTILINE | re.DOTALL)
+
 load_dotenv()
 
 class ContextFilter(logging.Filter):
@@ -81,67 +191,243 @@ class ContextFilter(logging.Filter):
         return True
     
 #from langchain_community.chat_models import ChatOpenAI
-from langchain_openai import ChatOpenAI
-from langchain_groq import ChatGroq
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain.schema import HumanMessage, SystemMessage
 import yaml
 
+# LangChain chat model class per provider, imported on first use so only the SDKs of routed providers load
+CHAT_MODEL_CLASSES = {
+    "openai": ("langchain_openai", "ChatOpenAI"),
+    "groq": ("langchain_groq", "ChatGroq"),
+    "google-gemini": ("langchain_google_genai", "ChatGoogleGenerativeAI"),
+    "anthropic": ("langchain_anthropic", "ChatAnthropic")
+}
+
+
+def chat_model_class(provider):
+    module, name = CHAT_MODEL_CLASSES[provider]
+    return getattr(importlib.import_module(module), name)
+
+
+def message_classes():
+    """(SystemMessage, HumanMessage), imported on the first LLM call rather than at startup"""
+    from langchain.schema import HumanMessage, SystemMessage
+    return SystemMessage, HumanMessage
+
+# Providers whose chat API accepts explicit cache_control breakpoints on message content blocks
+CACHE_BREAKPOINT_PROVIDERS = ("anthropic",)
+
 class LLMWrapper:
-    def __init__(self, config_path="llm_config.yaml"):
+    def __init__(self, config_path="llm_config.yaml", cache_mode="use", logger=None):
         with open(config_path) as f:
             self.config = yaml.safe_load(f)
             
         self.provider = self.config["model_provider"]
         #self.model = self._initialize_model()
-        self.models = self._initialize_models()
-
-    def _initialize_models(self):
-        provider = self.config["model_provider"]
-        params = self.config["model_settings"].get(provider, {})
+        self.models = {}
+        self._models_lock = threading.Lock()
+        self.cache = LLMResponseCache.from_config(self.config.get("cache"), mode=cache_mode)
+        self.logger = logger or logging.getLogger(__name__)
+        self.usage = LLMUsageTracker(self.logger)
+        self.scheduler = LLMRequestScheduler(self.config.get("rate_limits"), self.logger)
+        self.router = LLMRouter(self.config, self.logger)
+
+    def _upstream(self, provider, model, model_type):
+        """(provider, model) a request is actually sent to; the local model in record mode forwards to record_provider"""
+        settings = self.config.get("local", {})
+        if provider != "local" or settings.get("mode") != "record":
+            return provider, model
+        upstream_provider = settings.get("record_provider", "openai")
+        params = self.config["model_settings"].get(upstream_provider, {})
+        return upstream_provider, params["analysis_model" if model_type == "analysis" else "selenium_model"]
+
+    def _create_model(self, provider, model, temperature, json_mode, timeout=None):
+        if provider == "local":
+            # Offline provider for benchmarks and CI; record mode wraps a real provider
+            settings = self.config.get("local", {})
+            upstream = None
+            upstream_provider, upstream_model = self._upstream(provider, model, "analysis" if json_mode else "selenium")
+            if upstream_provider != provider:
+                params = self.config["model_settings"].get(upstream_provider, {})
+                upstream = self._create_model(upstream_provider, upstream_model, params.get("temperature", temperature),
+                                              json_mode, timeout)
+            return LocalChatModel(model, settings, json_mode=json_mode, upstream=upstream)
 
         # Get API key based on provider
-        api_key = os.getenv(
-            "OPENAI_API_KEY" if provider == "openai" else "GROQ_API_KEY"
-        )
+        if provider not in API_KEY_ENV:
+            raise ValueError(f"Unsupported provider: {provider}")
+        api_key = os.getenv(API_KEY_ENV[provider])
+        # Analysis calls run in JSON mode; script generation returns markdown.
+        # Anthropic has no JSON mode, so its analysis replies rely on the prompt and parse_structured.
+        extra = {"model_kwargs": {"response_format": {"type": "json_object"}}} if json_mode and provider != "anthropic" else {}
+        if provider == "anthropic":
+            # ChatAnthropic otherwise stops at 1024 output tokens, too few for a script
+            extra["max_tokens"] = self.config["model_settings"].get("anthropic", {}).get("max_tokens", 8192)
+        if timeout:
+            extra["timeout"] = timeout
 
         # Correct
         # ChatOpenAI(api_key=os.getenv("OPENAI_API_KEY"), model=..., temperature=...)
+        # Retries are handled by the request scheduler, failover by the router
+        chat_model = chat_model_class(provider)
         if provider == "openai":
             #return ChatOpenAI(**params)
-            return {
-            "analysis": ChatOpenAI(api_key=api_key, model=params["analysis_model"], temperature=params["temperature"], model_kwargs={"response_format": {"type": "json_object"}}),
-            "selenium": ChatOpenAI(api_key=api_key, model=params["selenium_model"], temperature=params["temperature"])
-        }
-        elif provider == "groq":
-            return {
-            "analysis": ChatGroq(api_key=api_key, model=params["analysis_model"], temperature=params["temperature"], model_kwargs={"response_format": {"type": "json_object"}}),
-            "selenium": ChatGroq(api_key=api_key, model=params["selenium_model"], temperature=params["temperature"])
-        }
-        #     return ChatGroq(**params)
-        elif provider == "google-gemini":
-            return {
-                "analysis": ChatGoogleGenerativeAI(api_key=os.getenv("GOOGLE_API_KEY"), model=params["analysis_model"], temperature=params["temperature"], model_kwargs={"response_format": {"type": "json_object"}}),
-                "selenium": ChatGoogleGenerativeAI(api_key=os.getenv("GOOGLE_API_KEY"), model=params["selenium_model"], temperature=params["temperature"])
-            }
-        else:
-            raise ValueError(f"Unsupported provider: {provider}")
+            # Response headers feed the scheduler's rate budget
+            extra["include_response_headers"] = True
+        return chat_model(api_key=api_key, model=model, temperature=temperature, max_retries=0, **extra)
+
+    def _model(self, target, model_type):
+        key = (target["provider"], target["model"], model_type)
+        with self._models_lock:
+            if key not in self.models:
+                self.models[key] = self._create_model(target["provider"], target["model"], self.router.temperature(target),
+                                                      json_mode=model_type == "analysis", timeout=target.get("timeout_seconds"))
+            return self.models[key]
+
+    def generate(self, system_prompt, user_prompt, model_type="analysis", call_site=None, json_schema=None,
+                 prompt_prefix=None):
+        """Send the prompt along the route for call_site/model_type, failing over to the next target on errors.
+
+        prompt_prefix is the stable part of the user message (page context),
+        sent before user_prompt. json_schema is a (schema, name) pair enforced
+        natively by providers that support it.
+        """
+        route, targets = self.router.route(call_site, model_type)
+        SystemMessage, HumanMessage = message_classes()
+        full_prompt = user_prompt if prompt_prefix is None else f"{prompt_prefix}\n{user_prompt}"
+
+        for index, target in enumerate(targets):
+            provider, model_name = target["provider"], target["model"]
+            # Rate limits, retries and usage follow the provider that serves the request
+            upstream_provider, upstream_model = self._upstream(provider, model_name, model_type)
+            messages = [
+                SystemMessage(content=system_prompt),
+                self._user_message(upstream_provider, prompt_prefix, user_prompt, full_prompt)
+            ]
+            response_format = self._native_response_format(provider, *json_schema) if json_schema else None
+            start = time.perf_counter()
+            # The response format changes what the model returns, so it is part of the cache key
+            key_prompt = system_prompt if response_format is None else f"{system_prompt}\n{json.dumps(response_format, sort_keys=True)}"
+            cache_key = self.cache.make_key(provider, model_name, self.router.temperature(target), key_prompt, full_prompt)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                self.usage.record(call_site, model_name, 0, 0, time.perf_counter() - start, cache="hit")
+                return cached
+
+            #return self.model.invoke(messages).content
+            model = self._model(target, model_type)
+            if response_format is not None:
+                model = model.bind(response_format=response_format)
+            last = index == len(targets) - 1
+            # With a fallback target, fail over quickly instead of sitting out long backoffs or repeated timeouts
+            retry_limits = {} if last else {"max_retries": self.router.retries_before_failover, "retry_timeouts": False}
+            try:
+                response = self.scheduler.call(
+                    upstream_provider,
+                    count_tokens(system_prompt) + count_tokens(full_prompt),
+                    lambda: model.invoke(messages),
+                    usage=lambda message: sum(response_usage(message)[:2]),
+                    headers=lambda message: (getattr(message, "response_metadata", None) or {}).get("headers"),
+                    **retry_limits
+                )
+            except Exception as e:
+                latency = time.perf_counter() - start
+                self.router.record(route, target, latency, ok=False, failover=not last)
+                self.usage.record(call_site, upstream_model, 0, 0, latency, cache="miss" if self.cache.mode != "off" else "off",
+                                  outcome="failed" if last else "failover")
+                if last:
+                    raise
+                self.logger.warning(f"{self.router.label(target)} failed for {call_site or model_type} "
+                                    f"({type(e).__name__}); failing over to {self.router.label(targets[index + 1])}")
+                continue
+
+            latency = time.perf_counter() - start
+            self.router.record(route, target, latency, ok=True)
+            prompt_tokens, completion_tokens, cached_tokens = response_usage(response)
+            self.usage.record(call_site, upstream_model, prompt_tokens, completion_tokens, latency,
+                              cache="miss" if self.cache.mode != "off" else "off", cached_tokens=cached_tokens)
+            content = response.content
+            self.cache.put(cache_key, content, provider=provider, model=model_name)
+            return content
+
+    def _user_message(self, provider, prompt_prefix, user_prompt, full_prompt):
+        """User message with an explicit cache breakpoint after the stable prefix where supported.
+
+        OpenAI, Groq and Gemini cache matching prompt prefixes automatically, so
+        for them the prefix only needs to come first.
+        """
+        _, HumanMessage = message_classes()
+        settings = self.config.get("prompt_caching", {})
+        if prompt_prefix is None or not settings.get("cache_breakpoints") or provider not in CACHE_BREAKPOINT_PROVIDERS:
+            return HumanMessage(content=full_prompt)
+        return HumanMessage(content=[
+            {"type": "text", "text": prompt_prefix, "cache_control": {"type": "ephemeral"}},
+            {"type": "text", "text": user_prompt}
+        ])
+
+    def _native_response_format(self, provider, schema, name):
+        """Provider-side JSON schema enforcement where the provider supports it, else None"""
+        settings = self.config.get("structured_output", {})
+        if provider != "openai" or not settings.get("native_schema", True):
+            # Other providers keep the json_object mode their analysis model is created with
+            return None
+        return {"type": "json_schema", "json_schema": {"name": name, "schema": schema, "strict": False}}
 
-    def generate(self, system_prompt, user_prompt, model_type="analysis"):
-        messages = [
-            SystemMessage(content=system_prompt),
-            HumanMessage(content=user_prompt)
-        ]
-        #return self.model.invoke(messages).content
-        return self.models[model_type].invoke(messages).content
+    def generate_json(self, system_prompt, user_prompt, schema, schema_name, model_type="analysis", call_site=None,
+                      prompt_prefix=None):
+        """Generate a response and return it parsed and validated against schema.
+
+        Truncated or slightly malformed JSON is salvaged locally. If the result
+        still does not validate, the model is asked once to repair its own
+        output (without the original page context) before giving up with
+        StructuredOutputError.
+        """
+        result = self.generate(system_prompt, user_prompt, model_type=model_type, call_site=call_site,
+                               json_schema=(schema, schema_name), prompt_prefix=prompt_prefix)
+        try:
+            return parse_structured(result, schema)
+        except StructuredOutputError as e:
+            error = e
+
+        retries = self.config.get("structured_output", {}).get("repair_retries", 1)
+        for _ in range(retries):
+            self.logger.warning(f"{call_site or 'LLM'} returned unusable JSON ({str(error)}); requesting a repair")
+            repair_prompt = f"""The JSON below does not satisfy the required schema.
+            Error: {str(error)}
+
+            Schema:
+            {json.dumps(schema)}
+
+            JSON to repair:
+            {result}
+
+            Return ONLY the corrected JSON. Keep every valid value unchanged."""
+            result = self.generate("You repair malformed JSON so it matches a JSON schema.", repair_prompt,
+                                   model_type="analysis", call_site=f"{call_site}:repair",
+                                   json_schema=(schema, schema_name))
+            try:
+                return parse_structured(result, schema)
+            except StructuredOutputError as e:
+                error = e
+        raise error
 
 
 class WebTestGenerator:
-    def __init__(self, log_level="INFO"):
+    def __init__(self, log_level="INFO", cache_mode="use", generation_workers=1,
+                 execution_workers=1, worker_memory_mb=768, warm_browsers=False, in_process=False,
+                 nav_idle_timeout=2.0, incremental=True, script_batch_size=1, config_path="llm_config.yaml",
+                 stream_results=False, results_db=None, log_queue=False, log_max_mb=0, log_backups=5):
         self.log_level = log_level.upper()
+        self.log_queue = log_queue
+        self.log_max_bytes = int(log_max_mb * 1024 * 1024)
+        self.log_backups = log_backups
+        self.generation_workers = max(1, generation_workers)
+        self.script_batch_size = max(1, script_batch_size)
+        self.batch_stats = []
+        self._batch_stats_lock = threading.Lock()
+        self.nav_idle_timeout = nav_idle_timeout
         self.groq_api_key = os.getenv("GROQ_API_KEY")
         self.openai_api_key = os.getenv("OPENAI_API_KEY")
-        self.llm = LLMWrapper()
+        self.logger = self.setup_logging()
+        self.llm = LLMWrapper(config_path=config_path, cache_mode=cache_mode, logger=self.logger)
         #self.model = "llama-3.3-70b-versatile"
         #self.model = "gpt-4o-2024-08-06"
         #self.selenium_model = "meta-llama/llama-4-maverick-17b-128e-instruct"
@@ -151,21 +437,45 @@ class WebTestGenerator:
         self.driver = None
         self.visited_pages = set()
         self.test_results = []
-        self.logger = self.setup_logging()
+        # Streamed results are appended to a JSONL file as each test finishes instead of kept in memory
+        self.result_sink = None
+        if stream_results:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            self.result_sink = JSONLResultSink(f"reports/test_results_{timestamp}.jsonl")
+        # Optional queryable history of runs across invocations, written in batches off the test loop
+        self.results_store = ResultsStore(results_db, logger=self.logger) if results_db else None
+        self.pipeline_stats = None
+        # Pages whose structure is unchanged since the last run reuse their test cases and scripts
+        self.fingerprints = PageFingerprintStore() if incremental else None
+        self.page_paths = []
         self.temperature = 0.3
+        self.compactor = HTMLCompactor(self.llm.config.get("html_compaction"))
+        self.screenshots = ScreenshotStore(self.llm.config.get("screenshots", {}).get("directory", "artifacts/screenshots"),
+                                           self.logger)
+        self.compaction_stats = []
         self.setup_browser()
+        self.navigation_watcher = NavigationWatcher(self.driver, self.logger)
         self.logger.addFilter(ContextFilter())
         self.logger.propagate = False  # Prevent duplicate logs
         self.url_extractor = URLExtractor(self.driver, self.logger)
+        self.execution_pool = ScriptExecutionPool(execution_workers, worker_memory_mb, self.logger)
+        self.browser_pool = BrowserPool(execution_workers, self.logger).start() if warm_browsers else None
+        # Warm browsers are handed to scripts through the subprocess environment, so the two modes are exclusive
+        self.inprocess_runner = InProcessRunner(timeout=30, logger=self.logger) if in_process and not warm_browsers else None
 
     def setup_browser(self):
+        self.driver = self.create_browser(navigation_events=True)
+
+    def create_browser(self, navigation_events=False):
         chrome_options = Options()
+        if navigation_events:
+            enable_navigation_events(chrome_options)
         chrome_options.add_argument("--headless")
         chrome_options.add_argument("--window-size=1920,1080")
         chrome_options.add_argument("--disable-gpu")
         chrome_options.add_argument("--no-sandbox")
         service = Service()
-        self.driver = webdriver.Chrome(service=service, options=chrome_options)
+        return webdriver.Chrome(service=service, options=chrome_options)
 
 
     def setup_logging(self):
@@ -177,6 +487,7 @@ class WebTestGenerator:
         
         # Remove existing handlers to prevent duplicates
         if logger.hasHandlers():
+            stop_queue_logging(logger)
             logger.handlers.clear()
         
         # Create formatter
@@ -192,27 +503,58 @@ class WebTestGenerator:
         log_file = f"logs/test_run_{timestamp}.log"
         os.makedirs('logs', exist_ok=True)
         
-        file_handler = logging.FileHandler(log_file)
+        # maxBytes=0 never rotates, matching a plain FileHandler
+        file_handler = RotatingFileHandler(log_file, maxBytes=self.log_max_bytes, backupCount=self.log_backups)
         file_handler.setLevel(numeric_level)
         file_handler.setFormatter(formatter)
         
         # Add handlers
-        logger.addHandler(file_handler)
-        logger.addHandler(console_handler)
+        if self.log_queue:
+            # Workers only enqueue records; a listener thread does the file and console I/O
+            start_queue_logging(logger, [file_handler, console_handler])
+        else:
+            logger.addHandler(file_handler)
+            logger.addHandler(console_handler)
         
         return logger
 
 
-    def capture_screenshot(self):
-        screenshot = self.driver.get_screenshot_as_png()
-        img = Image.open(BytesIO(screenshot))
-        buffered = BytesIO()
-        img.save(buffered, format="PNG")
-        return base64.b64encode(buffered.getvalue()).decode()
-    
+    def capture_screenshot(self, driver):
+        """Base64 screenshot of driver for LLM vision input; the browser's PNG is only re-encoded if configured"""
+        settings = self.llm.config.get("screenshots", {})
+        data, _ = prepare_for_llm(driver.get_screenshot_as_png(), max_width=settings.get("llm_max_width", 0),
+                                  image_format=settings.get("llm_format", "png"),
+                                  quality=settings.get("llm_quality", 80))
+        return to_base64(data)
+
     def analyze_page(self, context="current"):
         self.logger.info(f"Analyzing {context} page...")
-        page_source = self.driver.page_source
+        # Record the URL actually analyzed (after redirects) so navigation tracking skips it
+        url = self.driver.current_url
+        self.visited_pages.add(url)
+        page_source, static_metadata = self.snapshot_page()
+
+        fingerprint = page_fingerprint(page_source, static_metadata)
+        previous = self.reuse_page_analysis(url, fingerprint, page_source)
+        if previous:
+            return previous
+
+        with self.llm.usage.page(url):
+            page_metadata = self.enrich_page_metadata(static_metadata, page_source)
+            test_cases = self.generate_page_specific_tests(page_metadata, page_source)
+            scripts = self.generate_scripts(test_cases, page_metadata, page_source)
+        self.record_page_analysis(url, fingerprint, page_metadata, test_cases)
+        
+        return {
+            "metadata": page_metadata,
+            "test_cases": test_cases,
+            "scripts": scripts
+        }
+
+    def snapshot_page(self, driver=None):
+        """Return (compacted page_source, static metadata) for the page loaded in driver"""
+        driver = driver or self.driver
+        page_source = self.compact_page_source(driver.page_source, source="analyze_page", url=driver.current_url)
         #page_source = self.driver.page_source[:5000]  # First 5000 characters for LLM context so that it doesn't exceed token limit
         
         # Static metadata extraction
@@ -224,33 +566,95 @@ class WebTestGenerator:
         #     "tables": self.extract_data_tables(),
         #     "key_flows": self.identify_key_flows()
         # }
-        static_metadata = {
-            "title": self.driver.title,
-            "url": self.driver.current_url,
-            "forms": self.extract_forms(),
-            "buttons": self.extract_interactive_elements(),
-            "tables": self.extract_data_tables(),
-            "key_flows": self.identify_key_flows()
-        }
-        self.logger.debug(f"Static page metadata: {static_metadata}")
-        
+        static_metadata = self.extract_static_metadata(driver)
+        self.logger.debug("Static page metadata: %s", static_metadata)
+        return page_source, static_metadata
+
+    def enrich_page_metadata(self, static_metadata, page_source):
+        """Merge LLM page analysis into the static metadata"""
         # LLM-powered dynamic analysis
         llm_metadata = self.llm_page_analysis(page_source)
-        self.logger.debug(f"LLM Analysed page metadata: {llm_metadata}")
+        self.logger.debug("LLM Analysed page metadata: %s", llm_metadata)
 
         # Combine static and dynamic metadata
         page_metadata = {**static_metadata, **llm_metadata}
-        self.logger.debug(f"Combined page metadata: {page_metadata}")
+        self.logger.debug("Combined page metadata: %s", page_metadata)
+        return page_metadata
 
-        test_cases = self.generate_page_specific_tests(page_metadata, page_source)
-        scripts = [self.generate_script_for_test_case(tc, page_metadata, page_source) for tc in test_cases]
-        
+    def reuse_page_analysis(self, url, fingerprint, page_source):
+        """Return the stored analysis for url if the page is unchanged and its scripts still exist.
+
+        Scripts whose generation failed last time are generated again and the stored entry updated.
+        """
+        if self.fingerprints is None:
+            return None
+        entry = self.fingerprints.lookup(url, fingerprint)
+        if entry is None:
+            return None
+        scripts = self.fingerprints.load_scripts(entry)
+        if scripts is None:
+            self.logger.info(f"Stored scripts for {url} are missing; regenerating")
+            return None
+
+        test_cases = entry["test_cases"]
+        missing = [i for i, script in enumerate(scripts) if not script and i < len(test_cases)]
+        if missing:
+            self.logger.info(f"Regenerating {len(missing)} previously failed scripts for unchanged page {url}")
+            with self.llm.usage.page(url):
+                regenerated = self.generate_scripts([test_cases[i] for i in missing], entry["metadata"], page_source)
+            for i, script in zip(missing, regenerated):
+                scripts[i] = script
+            self.fingerprints.update(url, fingerprint, entry["metadata"], test_cases,
+                                     [tc.get('script_file', '') for tc in test_cases])
+
+        self.logger.info(f"Page unchanged since {entry['updated']}; reusing {len(scripts) - len(missing)} scripts for {url}")
+        self.page_paths.append({"url": url, "path": "reused", "fingerprint": fingerprint,
+                                "regenerated_scripts": len(missing)})
+        self._store_test_cases(url, entry["test_cases"], reused=True)
         return {
-            "metadata": page_metadata,
-            "test_cases": test_cases,
-            "scripts": scripts
+            "metadata": entry["metadata"],
+            "test_cases": entry["test_cases"],
+            "scripts": scripts,
+            "reused": True
         }
+
+    def record_page_analysis(self, url, fingerprint, page_metadata, test_cases):
+        """Remember the fingerprint and generated artifacts of a freshly analyzed page"""
+        self._store_test_cases(url, test_cases)
+        if self.fingerprints is None:
+            self.page_paths.append({"url": url, "path": "generated", "fingerprint": fingerprint})
+            return
+        path = "regenerated" if url in self.fingerprints.pages else "new"
+        self.page_paths.append({"url": url, "path": path, "fingerprint": fingerprint})
+        # Only keep complete results; a page without test cases is retried next run
+        if isinstance(test_cases, list) and test_cases:
+            script_files = [tc.get('script_file', '') for tc in test_cases]
+            self.fingerprints.update(url, fingerprint, page_metadata, test_cases, script_files)
+
+    def _store_test_cases(self, url, test_cases, reused=False):
+        if not self.results_store or not isinstance(test_cases, list):
+            return
+        for test_case in test_cases:
+            self.results_store.add("test_cases", {
+                "url": url,
+                "name": test_case.get("name", ""),
+                "type": test_case.get("type"),
+                "script_file": test_case.get("script_file"),
+                "reused": int(reused)
+            })
     
+    def compact_page_source(self, page_source, source, url=None):
+        """Strip non-semantic markup from page HTML before it is embedded in an LLM prompt"""
+        result = self.compactor.compact(page_source)
+        self.compaction_stats.append({
+            "url": url or self.driver.current_url,
+            "source": source,
+            **result.stats()
+        })
+        self.logger.info(f"HTML compaction ({source}): {result.tokens_before} -> {result.tokens_after} tokens"
+                         f"{' (truncated to budget)' if result.truncated else ''}")
+        return result.html
+
     def llm_page_analysis(self, page_source):
         """Perform dynamic page analysis using LLM"""
         try:
@@ -325,28 +729,38 @@ class WebTestGenerator:
             #     response_format={"type": "json_object"}
             # )
             system_prompt = "You are a web page analyst. Extract structural and functional metadata from HTML."
-            result = self.llm.generate(system_prompt, prompt, model_type="analysis")
-            #result = response.choices[0].message.content
-            self.logger.info("LLM analysis of current page completed")
-            self.logger.debug(f"Raw LLM response: {result}")
             try:
-                # Extract JSON from potential text explanation
-                json_str = result
-                if "```json" in result:
-                    json_str = result.split("```json")[1].split("```")[0].strip()
-                elif "```" in result:
-                    json_str = result.split("```")[1].strip()
-
-                self.logger.debug(f"Sanitized LLM response: {json_str}")
-                return json.loads(json_str)
-            except json.JSONDecodeError as e:
+                result = self.llm.generate_json(system_prompt, prompt, PAGE_ANALYSIS_SCHEMA, "page_analysis",
+                                                model_type="analysis", call_site="llm_page_analysis")
+            except StructuredOutputError as e:
                 self.logger.error(f"Failed to parse LLM response: {str(e)}")
                 return {}
+            #result = response.choices[0].message.content
+            self.logger.info("LLM analysis of current page completed")
+            self.logger.debug("Parsed LLM response: %s", result)
+            return result
             
         except Exception as e:
             self.logger.error(f"LLM page analysis failed: {str(e)}")
             return {}
     
+    def extract_static_metadata(self, driver=None):
+        """Collect static page metadata with a single DOM snapshot round trip"""
+        try:
+            return take_dom_snapshot(driver or self.driver)
+        except (WebDriverException, ValueError) as e:
+            self.logger.warning(f"DOM snapshot failed, falling back to per-element extraction: {str(e)}")
+            if driver is not None and driver is not self.driver:
+                raise
+            return {
+                "title": self.driver.title,
+                "url": self.driver.current_url,
+                "forms": self.extract_forms(),
+                "buttons": self.extract_interactive_elements(),
+                "tables": self.extract_data_tables(),
+                "key_flows": self.identify_key_flows()
+            }
+
     def extract_forms(self):
         forms = []
         for form in self.driver.find_elements(By.TAG_NAME, 'form'):
@@ -445,7 +859,9 @@ class WebTestGenerator:
             {json.dumps(page_metadata['contact_form_fields'], indent=2)}
             """
 
-        prompt = f"""Generate test cases in VALID JSON format with specific actual current page elements.
+        # Stable page context first so the prefix can be reused by provider-side prompt caching
+        page_context = self._page_context(page_metadata, page_source)
+        prompt = f"""Generate test cases in VALID JSON format with specific actual current page elements of the page above.
         Generate comprehensive test cases including both regular and authentication tests.
         Output ONLY valid JSON using this EXACT structure:
         {{
@@ -466,9 +882,6 @@ class WebTestGenerator:
             ]
         }}
         
-        Current page elements (Page Structure Metadata):
-        {json.dumps(page_metadata, indent=2)}
-
         {prompt_suffix}
 
         Use selectors from this page structure:
@@ -477,9 +890,6 @@ class WebTestGenerator:
         "forms": {json.dumps(page_metadata['forms'])},
         "buttons": {json.dumps(page_metadata['buttons'])}
         }}
-
-        Current page URL: {page_metadata['url']}
-        Current Page HTML: {page_source}
          
         Guidelines:
         1. Create tests SPECIFIC to these page elements
@@ -529,20 +939,12 @@ class WebTestGenerator:
             Generate comprehensive test cases covering both regular functionality and authentication flows when present. 
             Generate test cases using actual authentication test data only when needed and available.
             Ensure valid JSON output."""
-            result = self.llm.generate(system_prompt, prompt, model_type="analysis")
-            #result = response.choices[0].message.content
-            self.logger.debug(f"Raw LLM response: {result}")
-            self.logger.info("Received response from LLM")
             try:
-                # Extract JSON from potential text explanation
-                json_str = result
-                if "```json" in result:
-                    json_str = result.split("```json")[1].split("```")[0].strip()
-                elif "```" in result:
-                    json_str = result.split("```")[1].strip()
-                
-                #test_cases = json.loads(json_str)
-                parsed = json.loads(json_str)
+                parsed = self.llm.generate_json(system_prompt, prompt, TEST_CASES_SCHEMA, "test_cases",
+                                                model_type="analysis", call_site="generate_page_specific_tests",
+                                                prompt_prefix=page_context)
+                #result = response.choices[0].message.content
+                self.logger.info("Received response from LLM")
                 test_cases = parsed['test_cases']
                 #self.logger.info(f"Successfully parsed {len(test_cases.get('test_cases', []))} test cases")
                 self.logger.info(f"Successfully parsed {len(test_cases)} test cases")
@@ -550,7 +952,7 @@ class WebTestGenerator:
                 # Log the test cases for debugging
                 # for tc in test_cases.get('test_cases', []):
                 #     self.logger.info(f"Generated test case: {tc['id']} - {tc['name']} ({tc['type']})")
-                self.logger.debug("Test Case Details:\n" + json.dumps(test_cases, indent=2))
+                self.logger.debug("Test Case Details:\n%s", LazyJSON(test_cases, indent=2))
 
                 # Validate test data usage
                 if test_data:
@@ -558,10 +960,9 @@ class WebTestGenerator:
                 
                 return test_cases
 
-            except json.JSONDecodeError as e:
+            except StructuredOutputError as e:
                 self.logger.error(f"Failed to parse JSON for test cases: {str(e)}")
-                self.logger.debug(f"Raw response: {result}")
-                return {"test_cases": []}
+                return []
         except Exception as e:
             self.logger.error(f"Test generation failed: {str(e)}")
             return []
@@ -601,16 +1002,64 @@ class WebTestGenerator:
         
     #     return base_tests + auth_tests
 
-    def generate_script_for_test_case(self, test_case, page_metadata, page_source):
-        prompt = f"""Generate Python Selenium script for the following test cases:
-        {json.dumps(test_case, indent=2)}
-        
-        Page Structure:
+    def generate_scripts(self, test_cases, page_metadata, page_source):
+        """Generate scripts for all test cases, up to generation_workers at a time, in test-case order"""
+        if self.script_batch_size > 1 and len(test_cases) > 1:
+            # One job per batch of test cases sharing a single page-context prompt
+            jobs = [test_cases[i:i + self.script_batch_size] for i in range(0, len(test_cases), self.script_batch_size)]
+            generate_job = lambda batch: self.generate_script_batch(batch, page_metadata, page_source)
+        else:
+            jobs = [[tc] for tc in test_cases]
+            generate_job = lambda batch: [self.generate_script_for_test_case(batch[0], page_metadata, page_source)]
+
+        if self.generation_workers == 1 or len(jobs) <= 1:
+            return [script for job in jobs for script in generate_job(job)]
+
+        workers = min(self.generation_workers, len(jobs))
+        self.logger.info(f"Generating {len(test_cases)} scripts in {len(jobs)} jobs with {workers} concurrent workers")
+        page = self.llm.usage.current_page()
+
+        def generate(job):
+            # Worker threads do not inherit the caller's page context
+            with self.llm.usage.page(page):
+                return generate_job(job)
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="script-gen") as executor:
+            # executor.map yields results in submission order regardless of completion order
+            return [script for scripts in executor.map(generate, jobs) for script in scripts]
+
+    def _save_script(self, test_case, code):
+        """Atomically write a generated script to test_scripts/ and return its path"""
+        script_dir = "test_scripts"
+        os.makedirs(script_dir, exist_ok=True)
+
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        safe_name = re.sub(r'[^\w.-]+', '_', test_case['name'])
+        # Reserve a unique name: pages generated concurrently often share test names within a second,
+        # and the fingerprint store must never point one page at another page's script
+        fd, script_name = tempfile.mkstemp(dir=script_dir, prefix=f"test_{timestamp}_{safe_name}_", suffix='.py')
+        os.close(fd)
+
+        # Write to a temp file in the same directory and rename, so readers never see a partial script
+        fd, temp_path = tempfile.mkstemp(dir=script_dir, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            f.write(code)
+        os.replace(temp_path, script_name)
+        return script_name
+
+    def _page_context(self, page_metadata, page_source):
+        """Page metadata and HTML, identical in every prompt about the same page"""
+        return f"""Page Structure (Page Structure Metadata):
         {json.dumps(page_metadata, indent=2)}
 
+        Current page URL: {page_metadata.get('url')}
         Current page HTML:
         {page_source}
-        
+        """
+
+    def _script_context(self, page_metadata, page_source):
+        """Stable prompt prefix shared by every script generation request for a page"""
+        return f"""{self._page_context(page_metadata, page_source)}
         Use reliable selectors from page structure.
         IMPORTANT - Use EXACTLY this WebDriver setup for Selenium 4.15.2:
         ```
@@ -637,10 +1086,97 @@ class WebTestGenerator:
                 - Print clear instructions for manual solving
                 - Pause execution for 2 minutes (120 seconds)
                 - Add timeout exception handling
+        """
 
+    def _script_prompt(self, test_case):
+        """Variable prompt suffix for a single test case; follows _script_context"""
+        return f"""Generate Python Selenium script for the following test case on the page above:
+        {json.dumps(test_case, indent=2)}
+        
         Return ONLY executable Python code in markdown format.
         Return ONLY CODE in markdown blocks. No explanations.
         """
+
+    def _extract_code(self, content):
+        """Strip the markdown code fence around a generated script"""
+        if "```python" in content:
+            return content.split("```python")[1].split("```")[0].strip()
+        elif "```" in content:
+            return content.split("```")[1].strip()
+        return content.strip()
+
+    def _script_is_valid(self, code):
+        if not code or not self.validate_script_structure(code):
+            return False
+        try:
+            compile(code, "<generated>", "exec")
+            return True
+        except SyntaxError:
+            return False
+
+    def generate_script_batch(self, test_cases, page_metadata, page_source):
+        """Generate scripts for several test cases from one prompt carrying the page context once.
+
+        Scripts that are missing from the response or fail validation are
+        regenerated one by one with generate_script_for_test_case.
+        """
+        cases = "\n".join(
+            f"Test case {i}:\n{json.dumps(tc, indent=2)}" for i, tc in enumerate(test_cases, 1)
+        )
+        context = self._script_context(page_metadata, page_source)
+        prompt = f"""Generate one independent Python Selenium script for EACH of the following {len(test_cases)} test cases on the page above:
+        {cases}
+        
+        Output format - for every test case, in order, a delimiter line followed by the code:
+        {SCRIPT_DELIMITER.format(index=1)}
+        ```python
+        ...
+        ```
+        Each script must be complete and runnable on its own. No explanations.
+        """
+
+        scripts = {}
+        try:
+            content = self.llm.generate(SELENIUM_SYSTEM_PROMPT, prompt, model_type="selenium",
+                                        call_site="generate_script_batch", prompt_prefix=context)
+            self.logger.debug("Raw LLM response for script batch: %s", content)
+            for match in SCRIPT_DELIMITER_RE.finditer(content):
+                scripts[int(match.group("index"))] = self._extract_code(match.group("body"))
+        except Exception as e:
+            self.logger.error(f"Batched script generation failed: {str(e)}")
+
+        prefix_tokens = count_tokens(SELENIUM_SYSTEM_PROMPT + context)
+        stats = {
+            "test_cases": len(test_cases),
+            "fallbacks": 0,
+            "prompt_tokens_batched": prefix_tokens + count_tokens(prompt),
+            "prompt_tokens_per_case": sum(prefix_tokens + count_tokens(self._script_prompt(tc)) for tc in test_cases)
+        }
+        results = []
+        for i, test_case in enumerate(test_cases, 1):
+            code = scripts.get(i, "")
+            if self._script_is_valid(code):
+                script_name = self._save_script(test_case, code)
+                test_case['script_file'] = script_name
+                self.logger.info(f"Saved test script: {script_name}")
+                results.append(code)
+                continue
+
+            self.logger.warning(f"Batched script for '{test_case.get('name')}' is missing or invalid; regenerating it alone")
+            stats["fallbacks"] += 1
+            stats["prompt_tokens_batched"] += prefix_tokens + count_tokens(self._script_prompt(test_case))
+            results.append(self.generate_script_for_test_case(test_case, page_metadata, page_source))
+
+        stats["tokens_saved"] = stats["prompt_tokens_per_case"] - stats["prompt_tokens_batched"]
+        with self._batch_stats_lock:
+            self.batch_stats.append(stats)
+        self.logger.info(f"Script batch of {len(test_cases)}: {stats['fallbacks']} fallbacks, "
+                         f"~{stats['tokens_saved']} prompt tokens saved")
+        return results
+
+    def generate_script_for_test_case(self, test_case, page_metadata, page_source):
+        context = self._script_context(page_metadata, page_source)
+        prompt = self._script_prompt(test_case)
         
         try:
             # response = self.client.chat.completions.create(
@@ -668,28 +1204,11 @@ class WebTestGenerator:
             #return self._extract_code(response.choices[0].message.content)
             #script_content = self._extract_code(response.choices[0].message.content)
             #script_content= response.choices[0].message.content
-            system_prompt = """You are a senior Selenium automation engineer specializing in creating robust, reliable test scripts for Selenium 4.15.2. Generate executable Selenium code using provided selectors. Output ONLY valid Python code in markdown blocks. You write code that:
-                        - Uses best practices for element selection
-                        - Uses the correct WebDriver initialization pattern for Selenium 4.15.2
-                        - Waits for all JavaScript and AJAX on the page to load before starting any test steps
-                        - For CAPTCHA-protected pages:
-                            - Detect CAPTCHA elements using common selectors
-                            - Pause execution for manual solving when CAPTCHA is present
-                            - Add clear console instructions for user intervention
-                        - Implements proper waits and synchronization
-                        - Handles errors gracefully with retries
-                        - Includes detailed logging and reporting
-                        - Is specific to the website being tested, not generic"""
-            
-            script_content= self.llm.generate(system_prompt, prompt, model_type="selenium")
-            self.logger.debug(f"Raw LLM response generated code: {script_content}")
+            script_content= self.llm.generate(SELENIUM_SYSTEM_PROMPT, prompt, model_type="selenium", call_site="generate_script_for_test_case",
+                                              prompt_prefix=context)
+            self.logger.debug("Raw LLM response generated code: %s", script_content)
             # Extract just the Python code if it's wrapped in markdown code blocks
-            if "```python" in script_content:
-                code = script_content.split("```python")[1].split("```")[0].strip()
-            elif "```" in script_content:
-                code = script_content.split("```")[1].strip()
-            else:
-                code = script_content.strip()
+            code = self._extract_code(script_content)
             # Save script to file
             if code:
                 # Validate script contains required components
@@ -708,16 +1227,8 @@ class WebTestGenerator:
                 # if not all(re.search(p, script_content) for p in required_patterns):
                 #     raise ValueError("Invalid Selenium script structure")
                 
-                script_dir = "test_scripts"
-                if not os.path.exists(script_dir):
-                    os.makedirs(script_dir)
-                
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                script_name = f"{script_dir}/test_{timestamp}_{test_case['name'].replace(' ', '_')}.py"
-                
-                with open(script_name, 'w') as f:
-                    f.write(code)
-                    
+                script_name = self._save_script(test_case, code)
+                test_case['script_file'] = script_name
                 self.logger.info(f"Saved test script: {script_name}")
 
             return code
@@ -727,24 +1238,36 @@ class WebTestGenerator:
             return ""
     
     def track_navigation(self, base_url):
-        current_url = self.driver.current_url
+        """Analyze pages the browser navigates to, as reported by CDP Page.frameNavigated events.
+
+        New URLs are queued as they are seen, including navigations that happened
+        while an earlier page was being analyzed. Tracking ends once the queue is
+        empty and no navigation has arrived for nav_idle_timeout seconds.
+        """
+        pending = deque()
+        idle_since = time.monotonic()
         while True:
-            try:
-                WebDriverWait(self.driver, 30).until(
-                    lambda d: d.current_url != current_url
-                )
-                new_url = self.driver.current_url
-                if new_url in self.visited_pages or new_url == base_url:
+            for url in self.navigation_watcher.poll():
+                if url.rstrip('/') == base_url.rstrip('/') or url in self.visited_pages or url in pending:
+                    continue
+                self.logger.info(f"Navigation detected: {url}")
+                pending.append(url)
+
+            if not pending:
+                if time.monotonic() - idle_since >= self.nav_idle_timeout:
+                    self.logger.info("Navigation tracking completed")
                     break
-                
-                self.visited_pages.add(new_url)
-                page_analysis = self.analyze_page(context=new_url)
-                self.execute_test_cycle(page_analysis)
-                current_url = new_url
-                
-            except TimeoutException:
-                self.logger.info("Navigation tracking completed")
-                break
+                time.sleep(0.2)
+                continue
+
+            new_url = pending.popleft()
+            self.visited_pages.add(new_url)
+            if self.driver.current_url != new_url:
+                # The browser has moved on since this navigation was queued
+                self.driver.get(new_url)
+            page_analysis = self.analyze_page(context=new_url)
+            self.execute_test_cycle(page_analysis)
+            idle_since = time.monotonic()
 
     # def execute_test_cycle(self, analysis):
     #     for script in analysis['scripts']:
@@ -753,13 +1276,26 @@ class WebTestGenerator:
     #         if not result['success']:
     #             self._handle_test_failure(result, analysis['metadata'])
 
-    def execute_test_cycle(self, analysis):
-        for script in analysis['scripts']:
-            if not self.validate_script_structure(script):
-                continue
-                
-            result = self.execute_test_script(script)
-            self._log_test_result(result)
+    def execute_test_cycle(self, analysis, url=None):
+        # Scripts are generated one per test case, in test-case order
+        test_cases = analysis.get('test_cases') if isinstance(analysis.get('test_cases'), list) else []
+        jobs = [(script, test_cases[i] if i < len(test_cases) else {})
+                for i, script in enumerate(analysis['scripts']) if self.validate_script_structure(script)]
+        scripts = [script for script, _ in jobs]
+        # Results come back in script order even when executed in parallel
+        for (_, test_case), result in zip(jobs, self.execution_pool.run(scripts, self._timed_execute)):
+            result['test_name'] = test_case.get('name')
+            result['script_file'] = test_case.get('script_file')
+            screenshot = result.pop('screenshot', None)
+            if not result['success']:
+                self._handle_test_failure(result, analysis['metadata'], screenshot)
+            self._log_test_result(result, url, screenshot)
+
+    def _timed_execute(self, script, *args):
+        start = time.perf_counter()
+        result = self.execute_test_script(script, *args)
+        result['duration_seconds'] = round(time.perf_counter() - start, 3)
+        return result
 
     def validate_script_structure(self, script):
         required_imports = ['from selenium import webdriver', 'By']
@@ -777,59 +1313,158 @@ class WebTestGenerator:
             self.logger.error(f"Missing test data: {str(e)}")
             return {"success": False, "error": "Missing test data"}
 
-    def execute_test_script(self, script):
+    def execute_test_script(self, script, workspace=None):
+        temp_file = None
+        screenshot_file = None
+        browser = None
+        result = None
         try:
             # Validate script content
             if not script.strip():
                 return {'success': False, 'error': 'Empty test script'}
+
+            # Scripts using process-level features, or any script once the runner
+            # has abandoned too many stuck threads, take the subprocess path below
+            if self.inprocess_runner and self.inprocess_runner.can_run(script):
+                return self.inprocess_runner.run(script)
                 
             # Create temporary file for execution
-            with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.py') as f:
+            with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.py',
+                                             dir=workspace.tmp_dir if workspace else None) as f:
                 f.write(script)
                 temp_file = f.name
                 
+            # Pool workers isolate TMPDIR and thus the Chrome profile
+            env = workspace.env() if workspace else None
+            if self.browser_pool:
+                # Attach the script to a warm browser instead of starting its own
+                browser = self.browser_pool.acquire(script)
+                if browser:
+                    env = self.browser_pool.script_env(browser, env)
+                # Without a browser (the pool lost all sessions) the script starts its own Chrome
+            if not browser:
+                # The script's own Chrome is gone once it exits, so it saves its failure screenshot itself
+                screenshot_file = f"{temp_file}.png"
+                env = self._failure_screenshot_env(screenshot_file, env)
+
             # Execute using subprocess
-            result = subprocess.run(
+            completed = subprocess.run(
                 ['python', temp_file],
                 capture_output=True,
                 text=True,
-                timeout=30
+                timeout=30,
+                env=env
             )
             
-            return {
-                'success': result.returncode == 0,
-                'output': result.stdout,
-                'error': result.stderr
+            result = {
+                'success': completed.returncode == 0,
+                'output': completed.stdout,
+                'error': completed.stderr
             }
             
         except subprocess.TimeoutExpired:
-            return {'success': False, 'error': 'Test execution timed out'}
+            result = {'success': False, 'error': 'Test execution timed out'}
         except Exception as e:
-            return {'success': False, 'error': str(e)}
+            result = {'success': False, 'error': str(e)}
         finally:
-            if os.path.exists(temp_file):
+            if browser:
+                # Scripts that start their own Chrome take it down on exit; only a pooled
+                # session still shows the page the script failed on
+                if result and not result['success']:
+                    self._capture_failure(browser, result)
+                self.browser_pool.release(browser)
+            if screenshot_file and os.path.exists(screenshot_file):
+                if result and not result['success']:
+                    self._store_failure_screenshot(screenshot_file, result)
+                os.remove(screenshot_file)
+            if temp_file and os.path.exists(temp_file):
                 os.remove(temp_file)
+        return result
+
+    def _failure_screenshot_env(self, screenshot_file, env=None):
+        """Environment that makes the script shim save a screenshot to screenshot_file when the script fails"""
+        env = dict(env if env is not None else os.environ)
+        pythonpath = env.get("PYTHONPATH")
+        env.update({
+            "PYTHONPATH": SHIM_DIR + (os.pathsep + pythonpath if pythonpath else ""),
+            "AUTOTEST_FAILURE_SCREENSHOT": os.path.abspath(screenshot_file)
+        })
+        return env
 
         
-    def _log_test_result(self, result):
-        self.test_results.append({
+    def _log_test_result(self, result, url=None, screenshot=None):
+        entry = {
             'timestamp': datetime.now().isoformat(),
-            'url': self.driver.current_url,
+            'url': url or self.driver.current_url,
             'result': result
-        })
-
-    def _handle_test_failure(self, result, metadata):
+        }
+        if screenshot:
+            entry['screenshot'] = screenshot
+        if self.result_sink:
+            self.result_sink.write(entry)
+        else:
+            self.test_results.append(entry)
+        if self.results_store:
+            self.results_store.add("executions", {
+                "url": entry['url'],
+                "test_name": result.get('test_name'),
+                "script_file": result.get('script_file'),
+                "success": int(bool(result.get('success'))),
+                "runner": result.get('runner', 'subprocess'),
+                "duration_seconds": result.get('duration_seconds'),
+                "executed_at": entry['timestamp'],
+                "error": result.get('error') or None,
+                "screenshot": screenshot
+            })
+
+    def _handle_test_failure(self, result, metadata, screenshot=None):
         self.logger.error(f"Test failed: {result.get('error', 'Unknown error')}")
-        screenshot = self.capture_screenshot()
-        self.logger.info(f"Screenshot captured: {screenshot[:50]}...")
-        self.logger.debug(f"Page metadata at failure: {json.dumps(metadata)}")
+        self.logger.debug("Page metadata at failure: %s", LazyJSON(metadata))
+        if screenshot:
+            self.logger.info(f"Screenshot saved: {screenshot}")
+
+    def _capture_failure(self, browser, result):
+        """Queue a screenshot of the pooled browser a failed script ran in, before it is reset"""
+        try:
+            result['screenshot'] = self.screenshots.save(browser.driver.get_screenshot_as_png())
+        except WebDriverException as e:
+            self.logger.warning(f"Could not capture failure screenshot: {str(e)}")
+
+    def _store_failure_screenshot(self, screenshot_file, result):
+        """Queue the screenshot a failed script saved of its own browser"""
+        try:
+            with open(screenshot_file, 'rb') as f:
+                result['screenshot'] = self.screenshots.save(f.read())
+        except OSError as e:
+            self.logger.warning(f"Could not read failure screenshot: {str(e)}")
 
     def generate_report(self):
+        # Screenshot paths in the report must point at files that exist
+        self.screenshots.flush()
+        if self.result_sink:
+            # Results live in the stream; the report links to it and carries the summary
+            self.result_sink.close()
+            summary = summarize_results(self.result_sink.path)
+            test_results, success_rate = self.result_sink.path, summary['success_rate']
+        else:
+            summary = None
+            test_results = self.test_results
+            success_rate = len([r for r in self.test_results if r['result']['success']]) / len(self.test_results) if self.test_results else 0
         report = {
             'start_time': datetime.now().isoformat(),
             'pages_visited': list(self.visited_pages),
-            'test_results': self.test_results,
-            'success_rate': len([r for r in self.test_results if r['result']['success']]) / len(self.test_results) if self.test_results else 0,
+            'test_results': test_results,
+            'success_rate': success_rate,
+            'result_summary': summary,
+            'html_compaction': self.compaction_stats,
+            'llm_cache': self.llm.cache.stats(),
+            'pipeline': self.pipeline_stats,
+            'page_paths': self.page_paths,
+            'llm_usage': self.llm.usage.summary(),
+            'llm_rate_limits': self.llm.scheduler.stats(),
+            'llm_routing': self.llm.router.stats(),
+            'screenshots': self.screenshots.stats(),
+            'script_batching': self._batching_summary(),
             'generated_scripts': [f for f in os.listdir('test_scripts') if f.endswith('.py')]
         }
         
@@ -841,14 +1476,60 @@ class WebTestGenerator:
             
         with open(report_file, 'w') as f:
             json.dump(report, f, indent=2)
-            
+
+        if self.results_store:
+            self._store_run(report, report_file)
         return report_file
 
+    def _store_run(self, report, report_file):
+        """Write the run's pages, LLM calls and timings to the results store and close it"""
+        store = self.results_store
+        by_page = report['llm_usage']['by_page']
+        for page in self.page_paths:
+            usage = by_page.get(page['url'], {})
+            store.add("pages", {
+                "url": page['url'],
+                "path": page['path'],
+                "fingerprint": page['fingerprint'],
+                "llm_calls": usage.get('calls', 0),
+                "prompt_tokens": usage.get('prompt_tokens', 0),
+                "completion_tokens": usage.get('completion_tokens', 0),
+                "llm_seconds": usage.get('latency_seconds', 0.0)
+            })
+        for call in report['llm_usage']['calls']:
+            store.add("llm_calls", {
+                "url": call['page'],
+                "call_site": call['call_site'],
+                "model": call['model'],
+                "cache": call['cache'],
+                "prompt_tokens": call['prompt_tokens'],
+                "cached_prompt_tokens": call['cached_prompt_tokens'],
+                "completion_tokens": call['completion_tokens'],
+                "latency_seconds": call['latency_seconds']
+            })
+        store.add("timings", {"name": "run", "seconds": round(time.perf_counter() - store.started, 2)})
+        if self.pipeline_stats:
+            store.add("timings", {"name": "pipeline", "seconds": self.pipeline_stats['wall_seconds']})
+            for name, stage in self.pipeline_stats['stages'].items():
+                store.add("timings", {"name": f"stage:{name}", "seconds": stage['busy_seconds']})
+        store.update_run(finished_at=datetime.now().isoformat(), success_rate=report['success_rate'],
+                         report_file=report_file)
+        if store.flush():
+            self.logger.info(f"Stored run {store.run_id} in {store.path}")
+        store.close()
+
+    def _batching_summary(self):
+        if not self.batch_stats:
+            return None
+        totals = {key: sum(stats[key] for stats in self.batch_stats)
+                  for key in ("test_cases", "fallbacks", "prompt_tokens_batched", "prompt_tokens_per_case", "tokens_saved")}
+        return {"batch_size": self.script_batch_size, "batches": len(self.batch_stats), **totals}
+
     def _requires_login(self):
         """Use LLM to check if login/registration is required"""
         try:
             #page_html = self.driver.page_source[:5000]
-            page_html = self.driver.page_source
+            page_html = self.compact_page_source(self.driver.page_source, source="_requires_login")
             prompt = f"""Analyze this HTML page and respond ONLY with JSON: 
             {{ "requires_auth": boolean }} 
             Does this page contain login/registration forms or auth requirements?
@@ -868,21 +1549,10 @@ class WebTestGenerator:
             #     response_format={"type": "json_object"}
             # )
             system_prompt = "You are an authentication detector. Return JSON with 'requires_auth' boolean."
-            result = self.llm.generate(system_prompt, prompt, model_type="analysis")
-            try:
-                # Extract JSON from potential text explanation
-                json_str = result
-                if "```json" in result:
-                    json_str = result.split("```json")[1].split("```")[0].strip()
-                elif "```" in result:
-                    json_str = result.split("```")[1].strip()
-
-                parsed= json.loads(json_str)
-                self.logger.debug(f"Sanitized LLM response for login/signup check: {parsed}")
-                return parsed.get('requires_auth', False)
-            except json.JSONDecodeError as e:
-                self.logger.error(f"Failed to parse LLM response: {str(e)}")
-                return {}
+            parsed = self.llm.generate_json(system_prompt, prompt, REQUIRES_AUTH_SCHEMA, "requires_auth",
+                                            model_type="analysis", call_site="_requires_login")
+            self.logger.debug("Parsed LLM response for login/signup check: %s", parsed)
+            return parsed['requires_auth']
             #result = json.loads(response.choices[0].message.content)
             #return result.get('requires_auth', False)
             
@@ -903,6 +1573,8 @@ class WebTestGenerator:
         
     ## <--- This version of run_workflow function analyzes one single page at a time --->
     def run_workflow(self, url, username=None, password=None):
+        if self.results_store:
+            self.results_store.update_run(base_url=url, mode="workflow")
         self.driver.get(url)
         
         # if self._requires_login():
@@ -915,6 +1587,8 @@ class WebTestGenerator:
         self.track_navigation(url)
         
         self.driver.quit()
+        if self.browser_pool:
+            self.browser_pool.close()
         return self.generate_report()
 
 
@@ -938,6 +1612,22 @@ class WebTestGenerator:
     #     finally:
     #         self.driver.quit()
 
+    ## <--- Multi-page pipeline: crawl, then analyze, generate and execute pages as overlapping stages --->
+    def run_pipeline(self, base_url, crawl_depth=1, crawl_backend="browser", crawl_concurrency=1,
+                     crawl_rate=1.0, stage_workers=None, queue_size=4):
+        if self.results_store:
+            self.results_store.update_run(base_url=base_url, mode="pipeline")
+        try:
+            pipeline = PagePipeline(self, crawl_depth=crawl_depth, crawl_backend=crawl_backend,
+                                    crawl_concurrency=crawl_concurrency, crawl_rate=crawl_rate,
+                                    stage_workers=stage_workers, queue_size=queue_size)
+            self.pipeline_stats = pipeline.run(base_url)
+            return self.generate_report()
+        finally:
+            self.driver.quit()
+            if self.browser_pool:
+                self.browser_pool.close()
+
     def process_single_url(self, url, username, password):
         """Process individual URL with existing workflow"""
         self.logger.info(f"\n{'='*50}")
@@ -967,7 +1657,7 @@ class WebTestGenerator:
             )
             
             #page_html = self.driver.page_source[:10000]
-            page_html = self.driver.page_source
+            page_html = self.compact_page_source(self.driver.page_source, source="login_to_website")
             prompt = f"""Extract auth form selectors as JSON:
             {{
                 "username_selector": "css_selector", 
@@ -996,24 +1686,15 @@ class WebTestGenerator:
             #     response_format={"type": "json_object"}
             # )
             system_prompt= "You are a web form analyzer. Return JSON with auth form selectors and field types."
-            result = self.llm.generate(system_prompt, prompt, model_type="analysis")
-            
             #auth_data = json.loads(response.choices[0].message.content)
             try:
-                # Extract JSON from potential text explanation
-                json_str = result
-                if "```json" in result:
-                    json_str = result.split("```json")[1].split("```")[0].strip()
-                elif "```" in result:
-                    json_str = result.split("```")[1].strip()
-
-                self.logger.debug(f"Sanitized LLM response: {json_str}")
-                auth_data= json.loads(json_str)
-            except json.JSONDecodeError as e:
+                auth_data = self.llm.generate_json(system_prompt, prompt, AUTH_SELECTORS_SCHEMA, "auth_selectors",
+                                                   model_type="analysis", call_site="login_to_website")
+            except StructuredOutputError as e:
                 self.logger.error(f"Failed to parse LLM response: {str(e)}")
                 return {}
             #auth_data = json.loads(result)
-            self.logger.debug(f"Auth form structure: {json.dumps(auth_data, indent=2)}")
+            self.logger.debug("Auth form structure: %s", LazyJSON(auth_data, indent=2))
 
             # Fill credentials
             self.driver.find_element(By.CSS_SELECTOR, auth_data['username_selector']).send_keys(username)
@@ -1063,81 +1744,6 @@ class WebTestGenerator:
             return bool(re.match(r'\d{4}-\d{2}-\d{2}', value))
         return True
 
-from urllib.parse import urlparse, urljoin
-
-class URLExtractor:
-    def __init__(self, driver, logger=None):
-        self.driver = driver
-        self.logger = logger or logging.getLogger(__name__)
-        
-    def extract_urls(self, base_url, max_depth=2):
-        """Recursively extract unique internal URLs with BFS up to max_depth"""
-        self.logger.info(f"Starting recursive URL extraction from: {base_url}")
-        
-        try:
-            parsed_base = urlparse(base_url)
-            base_domain = parsed_base.netloc
-            visited = set()
-            to_visit = [(base_url, 0)]  # (url, depth)
-
-            while to_visit:
-                current_url, depth = to_visit.pop(0)
-                
-                if current_url in visited or depth > max_depth:
-                    continue
-                
-                try:
-                    self.logger.debug(f"Waiting 1 sec. before processing {current_url}")
-                    time.sleep(1)
-                    self.driver.get(current_url)
-                    WebDriverWait(self.driver, 10).until(
-                        EC.presence_of_element_located((By.TAG_NAME, 'body'))
-                    )
-                    visited.add(current_url)
-                    self.logger.info(f"Processing depth {depth}: {current_url}")
-
-                    # Extract links from current page
-                    links = self.driver.find_elements(By.TAG_NAME, 'a')
-                    new_urls = set()
-
-                    for link in links:
-                        href = link.get_attribute('href')
-                        if not href:
-                            continue
-                            
-                        full_url = urljoin(current_url, href)
-                        parsed_url = urlparse(full_url)
-                        
-                        if parsed_url.netloc == base_domain:
-                            # Normalize path and handle root URL
-                            path = parsed_url.path.rstrip('/') or '/'
-                            #clean_url = f"{parsed_url.scheme}://{parsed_url.netloc}{parsed_url.path}".rstrip('/')
-                            clean_url = f"{parsed_url.scheme}://{parsed_url.netloc}{path}"
-                            if clean_url not in visited:
-                                new_urls.add(clean_url)
-
-                    # Add discovered URLs to queue
-                    for url in new_urls:
-                        if url not in [u for u, _ in to_visit]:
-                            to_visit.append((url, depth + 1))
-                            
-                    self.logger.debug(f"Found {len(new_urls)} new URLs at depth {depth}")
-
-                except Exception as e:
-                    self.logger.error(f"Failed to process {current_url}: {str(e)}")
-
-            self.logger.info(f"Total unique URLs found: {len(visited)}")
-
-            for url in visited:
-                self.logger.debug(f"Found URL: {url}")
-
-            return sorted(visited)
-            
-        except Exception as e:
-            self.logger.error(f"URL extraction failed: {str(e)}")
-            return []
-        
-
 # if __name__ == "__main__":
 #     parser = argparse.ArgumentParser(description="Automated Website Testing Agent")
 #     parser.add_argument("--url", required=True, help="Website URL to test")
@@ -1162,11 +1768,99 @@ if __name__ == "__main__":
                         default="INFO",
                         choices=["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"],
                         help="Set logging level")
+    parser.add_argument("--config", default="llm_config.yaml",
+                        help="LLM configuration file (default: llm_config.yaml)")
+    cache_group = parser.add_mutually_exclusive_group()
+    cache_group.add_argument("--no-cache", action="store_const", dest="cache_mode", const="off",
+                             help="Bypass the LLM response cache")
+    cache_group.add_argument("--refresh-cache", action="store_const", dest="cache_mode", const="refresh",
+                             help="Ignore cached LLM responses but store fresh ones")
+    parser.set_defaults(cache_mode="use")
+    parser.add_argument("--generation-workers", type=int, default=1,
+                        help="Maximum number of test scripts generated concurrently per page")
+    parser.add_argument("--batch-size", type=int, default=1,
+                        help="Test cases per script generation prompt; the page context is sent once per batch (1 disables batching)")
+    parser.add_argument("--execution-workers", type=int, default=1,
+                        help="Maximum number of test scripts executed in parallel")
+    parser.add_argument("--worker-memory-mb", type=int, default=768,
+                        help="Memory budgeted per execution worker; caps workers to fit in 75%% of RAM")
+    parser.add_argument("--warm-browsers", action="store_true",
+                        help="Run scripts against a pool of pre-launched headless Chrome sessions")
+    parser.add_argument("--stream-results", action="store_true",
+                        help="Append each test result to a JSONL file as it finishes instead of keeping all results in memory")
+    parser.add_argument("--log-queue", action="store_true",
+                        help="Write logs from a background thread so workers never block on log I/O")
+    parser.add_argument("--log-max-mb", type=float, default=0,
+                        help="Rotate the log file at this size in MB (default: 0, no rotation)")
+    parser.add_argument("--log-backups", type=int, default=5,
+                        help="Rotated log files to keep (default: 5)")
+    parser.add_argument("--results-db", metavar="PATH",
+                        help="Also record runs, tests, executions and LLM usage in this SQLite database "
+                             "(query it with results_store.py)")
+    parser.add_argument("--full-regeneration", action="store_true",
+                        help="Regenerate test cases and scripts even for pages unchanged since the last run")
+    parser.add_argument("--nav-idle-timeout", type=float, default=2.0,
+                        help="Seconds without a new navigation before tracking ends (default: 2)")
+    parser.add_argument("--in-process", action="store_true",
+                        help="Execute scripts inside this interpreter instead of a subprocess each "
+                             "(ignored with --warm-browsers; failed in-process scripts get no screenshot)")
     
+    pipeline_group = parser.add_argument_group("pipeline mode")
+    pipeline_group.add_argument("--pipeline", action="store_true",
+                                help="Crawl the site and test every page through overlapping stages")
+    pipeline_group.add_argument("--crawl-depth", type=int, default=1, help="Maximum crawl depth (default: 1)")
+    pipeline_group.add_argument("--crawl-backend", default="browser", choices=["browser", "http"],
+                                help="Crawl pages in the browser, or over HTTP with browser fallback")
+    pipeline_group.add_argument("--crawl-concurrency", type=int, default=1,
+                                help="Fetches in flight while crawling (http backend only)")
+    pipeline_group.add_argument("--crawl-rate", type=float, default=1.0,
+                                help="Crawl requests per second per host")
+    pipeline_group.add_argument("--analysis-workers", type=int, default=2,
+                                help="Pages analyzed concurrently (one browser each)")
+    pipeline_group.add_argument("--test-workers", type=int, default=2,
+                                help="Pages whose test cases are generated concurrently")
+    pipeline_group.add_argument("--script-workers", type=int, default=2,
+                                help="Pages whose scripts are generated concurrently")
+    pipeline_group.add_argument("--execution-stage-workers", type=int, default=1,
+                                help="Pages whose scripts execute concurrently (each uses --execution-workers)")
+    pipeline_group.add_argument("--stage-queue-size", type=int, default=4,
+                                help="Pages buffered between pipeline stages")
+
     args = parser.parse_args()
     
-    tester = WebTestGenerator(log_level=args.loglevel.upper())  # Convert to uppercase
-    report_file = tester.run_workflow(args.url, args.username, args.password)
+    tester = WebTestGenerator(log_level=args.loglevel.upper(),  # Convert to uppercase
+                              cache_mode=args.cache_mode,
+                              generation_workers=args.generation_workers,
+                              script_batch_size=args.batch_size,
+                              execution_workers=args.execution_workers,
+                              worker_memory_mb=args.worker_memory_mb,
+                              warm_browsers=args.warm_browsers,
+                              in_process=args.in_process,
+                              nav_idle_timeout=args.nav_idle_timeout,
+                              incremental=not args.full_regeneration,
+                              config_path=args.config,
+                              stream_results=args.stream_results,
+                              results_db=args.results_db,
+                              log_queue=args.log_queue,
+                              log_max_mb=args.log_max_mb,
+                              log_backups=args.log_backups)
+    if args.pipeline:
+        report_file = tester.run_pipeline(
+            args.url,
+            crawl_depth=args.crawl_depth,
+            crawl_backend=args.crawl_backend,
+            crawl_concurrency=args.crawl_concurrency,
+            crawl_rate=args.crawl_rate,
+            stage_workers={
+                "analysis": args.analysis_workers,
+                "tests": args.test_workers,
+                "scripts": args.script_workers,
+                "execution": args.execution_stage_workers
+            },
+            queue_size=args.stage_queue_size
+        )
+    else:
+        report_file = tester.run_workflow(args.url, args.username, args.password)
     print(f"Test report generated: {report_file}")
 
     # if args.url:
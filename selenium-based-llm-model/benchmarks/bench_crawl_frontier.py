@@ -0,0 +1,101 @@
+"""Offline crawl benchmark over a synthetic link graph.
+
+Every page links to a shared navigation menu plus a few random pages, the
+shape that made the old list-based frontier quadratic. The legacy frontier is
+measured on a smaller graph because it does not finish on the full one in
+reasonable time.
+
+    python benchmarks/bench_crawl_frontier.py --pages 50000
+"""
+import argparse
+import logging
+import os
+import random
+import sys
+import time
+from urllib.parse import urljoin, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from url_extract import URLExtractor
+
+BASE = "https://bench.example"
+
+
+def build_graph(pages, nav_size, links_per_page, seed=7):
+    rng = random.Random(seed)
+    urls = [f"{BASE}/page/{i}" for i in range(pages)]
+    nav = urls[:nav_size]
+    return {url: nav + rng.sample(urls, links_per_page) for url in urls}
+
+
+class GraphExtractor(URLExtractor):
+    """URLExtractor whose pages come from an in-memory graph instead of the network"""
+
+    def __init__(self, graph):
+        super().__init__(logger=logging.getLogger("bench"), politeness_delay=0)
+        self.graph = graph
+
+    def _page_links(self, url):
+        return self.graph.get(url, [])
+
+
+def legacy_crawl(graph, base_url, max_depth):
+    """The original extract_urls frontier: list.pop(0) and a list rebuilt per link"""
+    base_domain = urlparse(base_url).netloc
+    visited = set()
+    to_visit = [(base_url, 0)]
+    while to_visit:
+        current_url, depth = to_visit.pop(0)
+        if current_url in visited or depth > max_depth:
+            continue
+        visited.add(current_url)
+        new_urls = set()
+        for href in graph.get(current_url, []):
+            parsed_url = urlparse(urljoin(current_url, href))
+            if parsed_url.netloc == base_domain:
+                path = parsed_url.path.rstrip('/') or '/'
+                clean_url = f"{parsed_url.scheme}://{parsed_url.netloc}{path}"
+                if clean_url not in visited:
+                    new_urls.add(clean_url)
+        for url in new_urls:
+            if url not in [u for u, _ in to_visit]:
+                to_visit.append((url, depth + 1))
+    return sorted(visited)
+
+
+def timed(label, pages, fn):
+    start = time.perf_counter()
+    found = fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:32} {pages:>8} pages  {len(found):>8} urls  {elapsed:>8.2f} s")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Synthetic crawl frontier benchmark")
+    parser.add_argument("--pages", type=int, default=50000, help="Pages in the synthetic graph")
+    parser.add_argument("--legacy-pages", type=int, default=3000, help="Graph size for the legacy frontier")
+    parser.add_argument("--nav-size", type=int, default=60, help="Links in the shared navigation menu")
+    parser.add_argument("--links", type=int, default=20, help="Random links per page")
+    parser.add_argument("--depth", type=int, default=10, help="Maximum crawl depth")
+    args = parser.parse_args()
+
+    start_url = f"{BASE}/page/0"
+
+    small = build_graph(args.legacy_pages, args.nav_size, args.links)
+    legacy = timed("legacy list frontier", args.legacy_pages, lambda: legacy_crawl(small, start_url, args.depth))
+    current = timed("deque frontier", args.legacy_pages,
+                    lambda: GraphExtractor(small).extract_urls(start_url, max_depth=args.depth))
+    assert legacy == current, "frontier change altered the crawl result"
+
+    large = build_graph(args.pages, args.nav_size, args.links)
+    timed("deque frontier", args.pages, lambda: GraphExtractor(large).extract_urls(start_url, max_depth=args.depth))
+    timed("priority frontier", args.pages,
+          lambda: GraphExtractor(large).extract_urls(start_url, max_depth=args.depth, prioritize=True))
+    timed("deque frontier, 2000 URL cap", args.pages,
+          lambda: GraphExtractor(large).extract_urls(start_url, max_depth=args.depth, max_urls=2000))
+
+
+if __name__ == "__main__":
+    main()
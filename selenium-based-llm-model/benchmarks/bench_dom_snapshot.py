@@ -0,0 +1,72 @@
+"""Count WebDriver commands needed to build static page metadata.
+
+Compares the legacy per-element extractors on WebTestGenerator with the single
+execute_script DOM snapshot.
+
+    python benchmarks/bench_dom_snapshot.py --url https://example.com --url https://example.org
+"""
+import argparse
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+
+from autotest import WebTestGenerator
+from dom_snapshot import WebDriverCommandCounter, take_dom_snapshot
+
+
+def legacy_metadata(driver):
+    # The legacy extractors only touch self.driver, so a bare namespace is enough
+    generator = SimpleNamespace(driver=driver)
+    return {
+        "title": driver.title,
+        "url": driver.current_url,
+        "forms": WebTestGenerator.extract_forms(generator),
+        "buttons": WebTestGenerator.extract_interactive_elements(generator),
+        "tables": WebTestGenerator.extract_data_tables(generator),
+        "key_flows": WebTestGenerator.identify_key_flows(generator)
+    }
+
+
+def measure(driver, extractor):
+    with WebDriverCommandCounter(driver) as counter:
+        start = time.perf_counter()
+        metadata = extractor(driver)
+        elapsed = time.perf_counter() - start
+    return counter.count, elapsed, metadata
+
+
+def main():
+    parser = argparse.ArgumentParser(description="WebDriver command count benchmark for static metadata")
+    parser.add_argument("--url", action="append", required=True, help="Page to measure (repeatable)")
+    args = parser.parse_args()
+
+    chrome_options = Options()
+    chrome_options.add_argument("--headless")
+    chrome_options.add_argument("--window-size=1920,1080")
+    driver = webdriver.Chrome(service=Service(), options=chrome_options)
+
+    try:
+        print(f"{'url':60} {'legacy cmds':>12} {'legacy s':>9} {'snapshot cmds':>14} {'snapshot s':>11} {'match':>6}")
+        for url in args.url:
+            driver.get(url)
+            legacy_count, legacy_time, legacy = measure(driver, legacy_metadata)
+            snapshot_count, snapshot_time, snapshot = measure(driver, take_dom_snapshot)
+            same_shape = (
+                len(legacy["forms"]) == len(snapshot["forms"])
+                and len(legacy["buttons"]) == len(snapshot["buttons"])
+                and len(legacy["tables"]) == len(snapshot["tables"])
+            )
+            print(f"{url[:60]:60} {legacy_count:>12} {legacy_time:>9.2f} {snapshot_count:>14} {snapshot_time:>11.2f} {str(same_shape):>6}")
+    finally:
+        driver.quit()
+
+
+if __name__ == "__main__":
+    main()
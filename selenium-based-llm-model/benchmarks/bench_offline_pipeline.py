@@ -0,0 +1,148 @@
+"""End-to-end pipeline benchmark that needs no network or API keys.
+
+Serves a synthetic site from a local HTTP server and runs the multi-page
+pipeline against it with model_provider "local", so crawl, analysis, test and
+script generation and execution throughput can be measured in CI. Only a local
+headless Chrome is required. Everything the run writes (logs, scripts, reports)
+goes to a temporary working directory.
+
+    python benchmarks/bench_offline_pipeline.py --pages 20 --llm-latency 0.5
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import yaml
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from autotest import WebTestGenerator
+
+
+def build_site(pages, links_per_page, seed=7):
+    rng = random.Random(seed)
+    site = {}
+    for i in range(pages):
+        links = "".join(f'<li><a href="/page/{j}">Page {j}</a></li>'
+                        for j in rng.sample(range(pages), min(links_per_page, pages)))
+        form = ""
+        if i % 3 == 0:
+            form = (f'<form id="form-{i}" action="/submit" method="post">'
+                    f'<input type="email" name="email" id="email-{i}" required>'
+                    f'<input type="text" name="message" id="message-{i}">'
+                    f'<button type="submit" id="send-{i}">Send</button></form>')
+        site[f"/page/{i}"] = (f"<!DOCTYPE html><html><head><title>Page {i}</title></head><body>"
+                              f"<nav><ul>{links}</ul></nav><main><h1>Page {i}</h1>{form}</main></body></html>")
+    site["/"] = site["/page/0"]
+    site["/robots.txt"] = "User-agent: *\nAllow: /\n"
+    return site
+
+
+def serve(site):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = site.get(self.path)
+            if body is None:
+                self.send_error(404)
+                return
+            data = body.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain" if self.path.endswith(".txt") else "text/html")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def write_config(path, args):
+    config = {
+        "model_provider": "local",
+        "model_settings": {"local": {"analysis_model": "local-analysis", "selenium_model": "local-selenium",
+                                     "temperature": 0.0}},
+        "html_compaction": {"enabled": True, "token_budget": 12000, "max_repeated_siblings": 3},
+        "cache": {"enabled": False},
+        "local": {
+            "mode": "replay" if args.recordings else "synthetic",
+            "recordings_dir": args.recordings or "llm_recordings",
+            "latency_seconds": args.llm_latency,
+            "latency_jitter_seconds": args.llm_jitter,
+            "test_cases_per_page": args.test_cases,
+            "script_runtime_seconds": args.script_runtime
+        }
+    }
+    with open(path, "w") as f:
+        yaml.safe_dump(config, f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end pipeline benchmark")
+    parser.add_argument("--pages", type=int, default=20, help="Pages in the synthetic site")
+    parser.add_argument("--links", type=int, default=5, help="Links per page")
+    parser.add_argument("--depth", type=int, default=3, help="Maximum crawl depth")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="Simulated seconds per LLM call")
+    parser.add_argument("--llm-jitter", type=float, default=0.1, help="Simulated latency jitter (seconds)")
+    parser.add_argument("--test-cases", type=int, default=3, help="Synthetic test cases per page")
+    parser.add_argument("--script-runtime", type=float, default=0.0, help="Seconds each synthetic script runs")
+    parser.add_argument("--recordings", help="Replay recorded responses from this directory")
+    parser.add_argument("--analysis-workers", type=int, default=2)
+    parser.add_argument("--test-workers", type=int, default=2)
+    parser.add_argument("--script-workers", type=int, default=2)
+    parser.add_argument("--execution-stage-workers", type=int, default=1)
+    parser.add_argument("--generation-workers", type=int, default=1)
+    parser.add_argument("--execution-workers", type=int, default=1)
+    parser.add_argument("--batch-size", type=int, default=1)
+    args = parser.parse_args()
+    if args.recordings:
+        args.recordings = os.path.abspath(args.recordings)
+
+    server = serve(build_site(args.pages, args.links))
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/page/0"
+
+    workdir = tempfile.mkdtemp(prefix="autotest-bench-")
+    os.chdir(workdir)
+    write_config("llm_config.yaml", args)
+
+    try:
+        start = time.perf_counter()
+        generator = WebTestGenerator(log_level="WARNING", cache_mode="off", incremental=False,
+                                     generation_workers=args.generation_workers,
+                                     execution_workers=args.execution_workers,
+                                     script_batch_size=args.batch_size)
+        report_file = generator.run_pipeline(
+            base_url, crawl_depth=args.depth, crawl_backend="http", crawl_concurrency=4, crawl_rate=100.0,
+            stage_workers={"analysis": args.analysis_workers, "tests": args.test_workers,
+                           "scripts": args.script_workers, "execution": args.execution_stage_workers})
+        elapsed = time.perf_counter() - start
+    finally:
+        server.shutdown()
+
+    with open(report_file) as f:
+        report = json.load(f)
+    pipeline = report["pipeline"]
+    pages = len(pipeline["pages"])
+    usage = report["llm_usage"]["run"]
+    print(f"workdir           {workdir}")
+    print(f"pages tested      {pages}")
+    print(f"scripts executed  {len(report['test_results'])} ({report['success_rate']:.0%} passed)")
+    print(f"LLM calls         {usage['calls']} ({usage['latency_seconds']:.1f}s simulated latency)")
+    print(f"wall time         {elapsed:.2f}s total, {pipeline['wall_seconds']:.2f}s pipeline")
+    print(f"throughput        {pages / pipeline['wall_seconds'] * 60:.1f} pages/min")
+    for name, stage in pipeline["stages"].items():
+        print(f"  {name:10} workers={stage['workers']:<3} processed={stage['processed']:<5} "
+              f"failed={stage['failed']:<3} busy={stage['busy_seconds']:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Startup benchmark: how long `import autotest` takes, measured with python -X importtime.
+
+Imports autotest in fresh interpreters, reports the median cumulative import
+time and the slowest direct imports, and exits non-zero when the median
+exceeds the budget or when a provider SDK or optional dependency that should
+only load on demand is imported at startup. Suitable as a CI regression gate.
+
+    python benchmarks/bench_startup.py --runs 5 --budget-ms 1000
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+MODULE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Top-level packages that must only be imported when first used
+LAZY_PACKAGES = ("groq", "openai", "anthropic", "langchain", "langchain_core", "langchain_openai", "langchain_groq",
+                 "langchain_google_genai", "langchain_anthropic", "google", "PIL", "jsonschema", "tiktoken", "lxml")
+
+
+def parse_importtime(stderr):
+    """Return [(depth, package, self_us, cumulative_us)] from -X importtime output"""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # Header line
+        name = fields[2].rstrip()
+        package = name.lstrip()
+        depth = (len(name) - len(package) - 1) // 2
+        entries.append((depth, package, int(fields[0]), int(fields[1])))
+    return entries
+
+
+def measure(module):
+    """Import module in a fresh interpreter; return (cumulative µs, direct imports, imported top-level packages)"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=MODULE_DIR, capture_output=True, text=True)
+    if result.returncode != 0:
+        sys.exit(f"import {module} failed:\n{result.stderr[-2000:]}")
+    entries = parse_importtime(result.stderr)
+    # Children are listed before their parent, so the direct imports of module precede its own depth-0 line
+    index = max(i for i, entry in enumerate(entries) if entry[0] == 0 and entry[1] == module)
+    children = []
+    for depth, package, _, cumulative in reversed(entries[:index]):
+        if depth == 0:
+            break
+        if depth == 1:
+            children.append((package, cumulative))
+    packages = {package.split(".")[0] for _, package, _, _ in entries}
+    return entries[index][3], children, packages
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure and budget the import time of autotest.py")
+    parser.add_argument("--module", default="autotest", help="Module to import (default: autotest)")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to measure")
+    parser.add_argument("--budget-ms", type=float, default=1000.0,
+                        help="Fail when the median cumulative import time exceeds this")
+    parser.add_argument("--top", type=int, default=10, help="Slowest direct imports to list")
+    args = parser.parse_args()
+
+    runs = [measure(args.module) for _ in range(max(1, args.runs))]
+    median_ms = statistics.median(total for total, _, _ in runs) / 1000
+    _, children, packages = runs[-1]
+    eager = sorted(package for package in packages if package in LAZY_PACKAGES)
+
+    print(f"import {args.module}: median {median_ms:.1f} ms over {len(runs)} runs "
+          f"(min {min(r[0] for r in runs) / 1000:.1f}, max {max(r[0] for r in runs) / 1000:.1f})")
+    print("slowest direct imports (last run):")
+    for package, cumulative in sorted(children, key=lambda child: -child[1])[:args.top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {package}")
+
+    failures = []
+    if median_ms > args.budget_ms:
+        failures.append(f"median import time {median_ms:.1f} ms exceeds the {args.budget_ms:.0f} ms budget")
+    if eager:
+        failures.append(f"imported at startup but should load on demand: {', '.join(eager)}")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if not failures:
+        print(f"OK: within the {args.budget_ms:.0f} ms budget, no on-demand dependencies imported")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
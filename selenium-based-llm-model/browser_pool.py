@@ -0,0 +1,145 @@
+import logging
+import os
+import queue
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+
+SHIM_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pool_shim")
+URL_PATTERN = re.compile(r"https?://[^\s'\"<>)]+")
+
+
+def script_origins(script):
+    """Origins a generated script may touch, taken from the URLs it contains"""
+    origins = set()
+    for url in URL_PATTERN.findall(script):
+        parsed = urlparse(url)
+        if parsed.scheme and parsed.netloc:
+            origins.add(f"{parsed.scheme}://{parsed.netloc}")
+    return sorted(origins)
+
+
+class WarmBrowser:
+    """A pre-launched headless Chrome that scripts attach to through its DevTools address"""
+
+    def __init__(self, chromedriver_path):
+        chrome_options = Options()
+        chrome_options.add_argument("--headless=new")
+        chrome_options.add_argument("--window-size=1920,1080")
+        chrome_options.add_argument("--disable-gpu")
+        chrome_options.add_argument("--no-sandbox")
+        chrome_options.add_argument("--remote-debugging-port=0")
+        self.driver = webdriver.Chrome(service=Service(chromedriver_path), options=chrome_options)
+        self.debugger_address = self.driver.capabilities["goog:chromeOptions"]["debuggerAddress"]
+        self.home_handle = self.driver.current_window_handle
+        self.origins = []
+
+    def reset(self, origins):
+        """Give the next script a clean context: one blank tab, no cookies, cache or storage"""
+        handles = self.driver.window_handles
+        if self.home_handle not in handles:
+            self.home_handle = handles[0]
+        for handle in handles:
+            if handle != self.home_handle:
+                self.driver.switch_to.window(handle)
+                self.driver.close()
+        self.driver.switch_to.window(self.home_handle)
+        self.driver.get("about:blank")
+
+        self.driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+        self.driver.execute_cdp_cmd("Network.clearBrowserCache", {})
+        for origin in origins:
+            self.driver.execute_cdp_cmd("Storage.clearDataForOrigin", {"origin": origin, "storageTypes": "all"})
+
+    def quit(self):
+        try:
+            self.driver.quit()
+        except WebDriverException:
+            pass
+
+
+class BrowserPool:
+    """Pool of warm headless Chrome sessions shared by generated scripts.
+
+    Generated scripts build their own driver with ChromeDriverManager and
+    webdriver.Chrome. Scripts run with pool_shim/ on PYTHONPATH; its
+    sitecustomize patches both so the script attaches to a leased browser
+    instead of resolving a driver and cold-starting Chrome.
+    """
+
+    def __init__(self, size=1, logger=None):
+        self.size = max(1, size)
+        self.logger = logger or logging.getLogger(__name__)
+        self.chromedriver_path = None
+        self._available = queue.Queue()
+        self._browsers = []
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Resolve chromedriver once and launch all browsers in parallel"""
+        from webdriver_manager.chrome import ChromeDriverManager
+        self.chromedriver_path = ChromeDriverManager().install()
+        with ThreadPoolExecutor(max_workers=self.size) as executor:
+            for browser in executor.map(lambda _: WarmBrowser(self.chromedriver_path), range(self.size)):
+                self._browsers.append(browser)
+                self._available.put(browser)
+        self.logger.info(f"Browser pool ready with {self.size} warm Chrome sessions")
+        return self
+
+    def acquire(self, script=""):
+        """Lease a browser, or return None once the pool has shrunk to nothing"""
+        while True:
+            try:
+                browser = self._available.get(timeout=1.0)
+                break
+            except queue.Empty:
+                with self._lock:
+                    if not self._browsers:
+                        return None
+        browser.origins = script_origins(script)
+        return browser
+
+    def release(self, browser):
+        """Reset and return a browser; never raises, since it runs in the caller's cleanup path"""
+        try:
+            browser.reset(browser.origins)
+        except WebDriverException as e:
+            # The script left the browser unusable; replace it with a fresh one
+            self.logger.warning(f"Recycling pooled browser after failed reset: {str(e)}")
+            browser.quit()
+            try:
+                replacement = WarmBrowser(self.chromedriver_path)
+            except Exception as e:
+                with self._lock:
+                    self._browsers.remove(browser)
+                    remaining = len(self._browsers)
+                self.logger.error(f"Could not start a replacement browser ({str(e)}); "
+                                  f"pool shrinks to {remaining} sessions")
+                return
+            with self._lock:
+                self._browsers[self._browsers.index(browser)] = replacement
+            browser = replacement
+        self._available.put(browser)
+
+    def script_env(self, browser, env=None):
+        """Environment that makes the pool shim attach a script to the leased browser"""
+        env = dict(env if env is not None else os.environ)
+        pythonpath = env.get("PYTHONPATH")
+        env.update({
+            "PYTHONPATH": SHIM_DIR + (os.pathsep + pythonpath if pythonpath else ""),
+            "AUTOTEST_DEBUGGER_ADDRESS": browser.debugger_address,
+            "AUTOTEST_CHROMEDRIVER_PATH": self.chromedriver_path
+        })
+        return env
+
+    def close(self):
+        with self._lock:
+            for browser in self._browsers:
+                browser.quit()
+            self._browsers = []
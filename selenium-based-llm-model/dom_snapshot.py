@@ -0,0 +1,107 @@
+"""Single round-trip DOM snapshot used to build static page metadata.
+
+The per-element extractors on WebTestGenerator issue one WebDriver command for
+every find_elements / get_attribute / .text access. This module collects the
+same information with one execute_script call and returns it in the same shape.
+"""
+
+# Mirrors Selenium's get_attribute semantics: the DOM property wins when it is a
+# primitive (so href/action come back absolute), otherwise the raw attribute.
+SNAPSHOT_SCRIPT = """
+function attr(el, name) {
+    var prop = el[name];
+    if (prop === undefined || prop === null || typeof prop === 'object' || typeof prop === 'function') {
+        var value = el.getAttribute(name);
+        return value === null ? null : String(value);
+    }
+    return String(prop);
+}
+function text(el) {
+    return (el.innerText || '').trim();
+}
+function all(root, selector) {
+    return Array.prototype.slice.call(root.querySelectorAll(selector));
+}
+
+var forms = all(document, 'form').map(function (form) {
+    return {
+        id: attr(form, 'id'),
+        action: attr(form, 'action'),
+        method: attr(form, 'method'),
+        inputs: all(form, 'input').map(function (inp) {
+            return {type: attr(inp, 'type'), name: attr(inp, 'name'), id: attr(inp, 'id')};
+        }),
+        buttons: all(form, 'button').map(function (btn) {
+            return {type: attr(btn, 'type'), text: text(btn), id: attr(btn, 'id')};
+        })
+    };
+});
+
+var buttons = all(document, 'button, a, input, select, textarea').map(function (el) {
+    return {
+        tag: el.tagName.toLowerCase(),
+        text: text(el).substring(0, 50),
+        id: attr(el, 'id'),
+        type: attr(el, 'type')
+    };
+});
+
+var tables = all(document, 'table').map(function (table) {
+    return {
+        id: attr(table, 'id'),
+        headers: all(table, 'th').map(text),
+        row_count: all(table, 'tr').length
+    };
+});
+
+var keyFlows = {
+    main_navigation: all(document, 'nav a, .menu a').slice(0, 5).map(function (a) {
+        return attr(a, 'href');
+    }),
+    primary_actions: all(document, '.primary-btn, .cta-button').map(text)
+};
+
+return {
+    title: document.title,
+    url: window.location.href,
+    forms: forms,
+    buttons: buttons,
+    tables: tables,
+    key_flows: keyFlows
+};
+"""
+
+
+def take_dom_snapshot(driver):
+    """Return title, url, forms, buttons, tables and key_flows from one execute_script call"""
+    snapshot = driver.execute_script(SNAPSHOT_SCRIPT)
+    if not isinstance(snapshot, dict):
+        raise ValueError(f"Unexpected DOM snapshot result: {type(snapshot).__name__}")
+    return snapshot
+
+
+class WebDriverCommandCounter:
+    """Count WebDriver commands issued through a driver (used by the benchmarks)"""
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.count = 0
+        self.by_command = {}
+        self._original_execute = None
+
+    def __enter__(self):
+        self._original_execute = self.driver.execute
+
+        def counting_execute(driver_command, params=None):
+            self.count += 1
+            self.by_command[driver_command] = self.by_command.get(driver_command, 0) + 1
+            return self._original_execute(driver_command, params)
+
+        # WebElement commands are routed through parent.execute, so patching
+        # the driver instance catches element-level calls as well.
+        self.driver.execute = counting_execute
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        del self.driver.execute
+        return False
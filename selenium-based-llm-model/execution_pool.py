@@ -0,0 +1,100 @@
+import logging
+import os
+import queue
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+
+def total_memory_mb():
+    """Physical memory in MB, or None when the platform does not expose it"""
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") // (1024 * 1024)
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+class WorkerWorkspace:
+    """Scratch space owned by one execution worker.
+
+    Scripts started from this workspace get their own TMPDIR, which is where
+    chromedriver creates the temporary Chrome profile for each session, so
+    concurrent scripts never share profile, cache or download directories.
+    """
+
+    def __init__(self, index):
+        self.index = index
+        self.root = tempfile.mkdtemp(prefix=f"autotest-worker-{index}-")
+        self.tmp_dir = os.path.join(self.root, "tmp")
+        self.reset()
+
+    def env(self):
+        env = dict(os.environ)
+        env.update({
+            "TMPDIR": self.tmp_dir,
+            "TEMP": self.tmp_dir,
+            "TMP": self.tmp_dir,
+            "AUTOTEST_WORKER_INDEX": str(self.index)
+        })
+        return env
+
+    def reset(self):
+        """Drop anything the previous script left behind"""
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+        os.makedirs(self.tmp_dir)
+
+    def cleanup(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+
+class ScriptExecutionPool:
+    """Run generated test scripts on a bounded number of workers.
+
+    The worker count is capped by the CPU count and by how many workers fit in
+    75% of physical memory at memory_per_worker_mb each, since every script
+    runs its own Chrome. Results come back in the order the scripts were given.
+    """
+
+    def __init__(self, workers=1, memory_per_worker_mb=768, logger=None):
+        self.requested_workers = max(1, workers)
+        self.memory_per_worker_mb = memory_per_worker_mb
+        self.logger = logger or logging.getLogger(__name__)
+
+    def effective_workers(self, script_count):
+        limits = [self.requested_workers, os.cpu_count() or 1, script_count]
+        memory = total_memory_mb()
+        if memory and self.memory_per_worker_mb:
+            limits.append(int(memory * 0.75) // self.memory_per_worker_mb)
+        return max(1, min(limits))
+
+    def run(self, scripts, execute):
+        """Call execute(script, workspace) for each script and return results in input order"""
+        if not scripts:
+            return []
+        workers = self.effective_workers(len(scripts))
+        if workers == 1:
+            return [execute(script) for script in scripts]
+
+        if workers < self.requested_workers:
+            self.logger.info(f"Execution workers capped at {workers} (requested {self.requested_workers})")
+        self.logger.info(f"Executing {len(scripts)} scripts on {workers} workers")
+
+        workspaces = queue.Queue()
+        created = [WorkerWorkspace(i) for i in range(workers)]
+        for workspace in created:
+            workspaces.put(workspace)
+
+        def run_one(script):
+            workspace = workspaces.get()
+            try:
+                return execute(script, workspace)
+            finally:
+                workspace.reset()
+                workspaces.put(workspace)
+
+        try:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="script-exec") as executor:
+                return list(executor.map(run_one, scripts))
+        finally:
+            for workspace in created:
+                workspace.cleanup()
@@ -0,0 +1,249 @@
+import re
+from html import escape
+from html.parser import HTMLParser
+
+
+DEFAULT_COMPACTION_CONFIG = {
+    "enabled": True,
+    # Whole subtrees that carry no meaning for test generation
+    "strip_tags": ["script", "style", "svg", "noscript", "iframe", "template",
+                   "canvas", "object", "embed", "link", "meta", "head"],
+    # Attributes worth keeping for selectors and semantics; everything else is dropped
+    "keep_attributes": ["id", "class", "name", "type", "href", "action", "method",
+                        "value", "placeholder", "for", "role", "title", "alt",
+                        "required", "disabled", "checked", "selected", "readonly",
+                        "maxlength", "minlength", "pattern", "min", "max"],
+    "keep_attribute_prefixes": ["aria-", "data-test", "data-qa", "data-cy"],
+    "max_class_names": 4,
+    "max_repeated_siblings": 3,
+    "token_budget": 12000
+}
+
+VOID_ELEMENTS = {"area", "base", "br", "col", "embed", "hr", "img", "input",
+                 "link", "meta", "param", "source", "track", "wbr"}
+PRESERVE_WHITESPACE = {"pre", "textarea"}
+# Every form control is a test target, so these (and anything containing them) are never collapsed
+FORM_CONTROLS = {"input", "select", "textarea", "option", "optgroup", "button", "datalist"}
+# Text-only elements are only collapsed when they are list items or table rows
+REPEATED_ITEMS = {"li", "tr"}
+SIGNATURE_ATTRIBUTES = ("id", "name", "type", "href", "for", "role")
+
+
+def count_tokens(text):
+    """Count tokens with tiktoken when installed, otherwise estimate ~4 chars per token"""
+    encoding = _encoding()
+    if encoding:
+        try:
+            return len(encoding.encode(text, disallowed_special=()))
+        except Exception:
+            pass
+    return (len(text) + 3) // 4
+
+
+_ENCODING = None
+
+
+def _encoding():
+    """The cl100k_base encoding, or False without tiktoken; tiktoken is imported on first use"""
+    global _ENCODING
+    if _ENCODING is None:
+        try:
+            import tiktoken
+            _ENCODING = tiktoken.get_encoding("cl100k_base")
+        except ImportError:  # Token counts fall back to a chars/4 estimate
+            _ENCODING = False
+    return _ENCODING
+
+
+class _Node:
+    __slots__ = ("tag", "attrs", "children")
+
+    def __init__(self, tag, attrs=None):
+        self.tag = tag
+        self.attrs = attrs or []
+        self.children = []
+
+
+class _TreeBuilder(HTMLParser):
+    """Build a lightweight tree, dropping stripped subtrees, comments and noisy attributes"""
+
+    def __init__(self, config):
+        super().__init__(convert_charrefs=True)
+        self.config = config
+        self.strip_tags = set(config["strip_tags"])
+        self.keep_attributes = set(config["keep_attributes"])
+        self.keep_prefixes = tuple(config["keep_attribute_prefixes"])
+        self.root = _Node(None)
+        self.stack = [self.root]
+        self.skip_depth = 0
+        self.skip_tag = None
+
+    def _filter_attrs(self, attrs):
+        kept = []
+        for name, value in attrs:
+            if name not in self.keep_attributes and not name.startswith(self.keep_prefixes):
+                continue
+            if name == "class" and value:
+                value = " ".join(value.split()[:self.config["max_class_names"]])
+            kept.append((name, value))
+        return kept
+
+    def _is_tracking_pixel(self, tag, attrs):
+        if tag != "img":
+            return False
+        sizes = {name: value for name, value in attrs if name in ("width", "height")}
+        return bool(sizes) and all(v in ("0", "1") for v in sizes.values())
+
+    def handle_starttag(self, tag, attrs):
+        if self.skip_depth:
+            if tag == self.skip_tag and tag not in VOID_ELEMENTS:
+                self.skip_depth += 1
+            return
+        if tag in self.strip_tags or self._is_tracking_pixel(tag, attrs):
+            if tag not in VOID_ELEMENTS:
+                self.skip_depth = 1
+                self.skip_tag = tag
+            return
+        node = _Node(tag, self._filter_attrs(attrs))
+        self.stack[-1].children.append(node)
+        if tag not in VOID_ELEMENTS:
+            self.stack.append(node)
+
+    def handle_startendtag(self, tag, attrs):
+        if self.skip_depth or tag in self.strip_tags or self._is_tracking_pixel(tag, attrs):
+            return
+        self.stack[-1].children.append(_Node(tag, self._filter_attrs(attrs)))
+
+    def handle_endtag(self, tag):
+        if self.skip_depth:
+            if tag == self.skip_tag:
+                self.skip_depth -= 1
+            return
+        # Tolerate unbalanced markup by closing up to the nearest matching tag
+        for i in range(len(self.stack) - 1, 0, -1):
+            if self.stack[i].tag == tag:
+                del self.stack[i:]
+                return
+
+    def handle_data(self, data):
+        if self.skip_depth:
+            return
+        if not any(node.tag in PRESERVE_WHITESPACE for node in self.stack):
+            data = re.sub(r"\s+", " ", data)
+            if data == " ":
+                return
+        if data:
+            self.stack[-1].children.append(data)
+
+
+class CompactionResult:
+    def __init__(self, html, tokens_before, tokens_after, truncated=False):
+        self.html = html
+        self.tokens_before = tokens_before
+        self.tokens_after = tokens_after
+        self.truncated = truncated
+
+    def stats(self):
+        return {
+            "tokens_before": self.tokens_before,
+            "tokens_after": self.tokens_after,
+            "truncated": self.truncated
+        }
+
+
+class HTMLCompactor:
+    """Reduce raw page_source to the markup an LLM needs for page analysis and test generation"""
+
+    def __init__(self, config=None):
+        self.config = {**DEFAULT_COMPACTION_CONFIG, **(config or {})}
+
+    def compact(self, html):
+        tokens_before = count_tokens(html)
+        if not self.config["enabled"]:
+            return CompactionResult(html, tokens_before, tokens_before)
+
+        builder = _TreeBuilder(self.config)
+        builder.feed(html)
+        builder.close()
+
+        self._dedupe(builder.root)
+        compacted = self._serialize(builder.root).strip()
+        compacted, truncated = self._cap(compacted)
+        return CompactionResult(compacted, tokens_before, count_tokens(compacted), truncated)
+
+    def _signature(self, node):
+        """Structural signature of an element: tag, classes, identifying attributes and child tags"""
+        attrs = dict(node.attrs)
+        identity = tuple(attrs.get(name) for name in SIGNATURE_ATTRIBUTES)
+        child_tags = tuple(child.tag for child in node.children if isinstance(child, _Node))
+        return (node.tag, attrs.get("class") or "", identity, child_tags)
+
+    def _collapsible(self, node):
+        """Whether node may be folded into a run of repeats; form controls and plain text blocks never are"""
+        if node.tag in FORM_CONTROLS or self._contains_form_control(node):
+            return False
+        return node.tag in REPEATED_ITEMS or any(isinstance(child, _Node) for child in node.children)
+
+    def _contains_form_control(self, node):
+        return any(isinstance(child, _Node) and (child.tag in FORM_CONTROLS or self._contains_form_control(child))
+                   for child in node.children)
+
+    def _dedupe(self, node):
+        """Keep the first few of each run of identical sibling structures (list items, cards, rows)"""
+        limit = self.config["max_repeated_siblings"]
+        kept = []
+        run_signature, run_length, omitted = None, 0, 0
+
+        def close_run():
+            if omitted:
+                tag, classes = run_signature[0], run_signature[1]
+                label = f'<{tag} class="{classes}">' if classes else f"<{tag}>"
+                kept.append(f"<!-- {omitted} more similar {label} omitted -->")
+
+        for child in node.children:
+            if isinstance(child, _Node):
+                self._dedupe(child)
+                signature = self._signature(child) if limit and self._collapsible(child) else None
+                if signature is not None and signature == run_signature:
+                    run_length += 1
+                    if run_length > limit:
+                        omitted += 1
+                        continue
+                else:
+                    close_run()
+                    run_signature, run_length, omitted = signature, 1, 0
+            else:
+                close_run()
+                run_signature, run_length, omitted = None, 0, 0
+            kept.append(child)
+        close_run()
+        node.children = kept
+
+    def _serialize(self, node):
+        parts = []
+        for child in node.children:
+            if isinstance(child, str):
+                parts.append(child if child.startswith("<!--") else escape(child, quote=False))
+                continue
+            attrs = "".join(
+                f' {name}' if value is None else f' {name}="{escape(value)}"'
+                for name, value in child.attrs
+            )
+            if child.tag in VOID_ELEMENTS:
+                parts.append(f"<{child.tag}{attrs}>")
+            else:
+                parts.append(f"<{child.tag}{attrs}>{self._serialize(child)}</{child.tag}>")
+        return "".join(parts)
+
+    def _cap(self, html):
+        """Truncate at a tag boundary so the result fits the configured token budget"""
+        budget = self.config["token_budget"]
+        if not budget or count_tokens(html) <= budget:
+            return html, False
+        # Shrink proportionally until under budget; usually converges in one or two passes
+        cut = len(html)
+        while cut > 0 and count_tokens(html[:cut]) > budget:
+            cut = int(cut * budget / count_tokens(html[:cut]) * 0.98)
+            boundary = html.rfind(">", 0, cut)
+            cut = boundary + 1 if boundary > 0 else cut
+        return html[:cut] + "<!-- truncated to token budget -->", True
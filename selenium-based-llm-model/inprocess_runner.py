@@ -0,0 +1,301 @@
+import ast
+import builtins
+import hashlib
+import io
+import logging
+import sys
+import threading
+import time
+import traceback
+
+SCRIPT_FILENAME = "<autotest-script>"
+
+# Calls that would take down or reconfigure the whole process; scripts using
+# them are sent to the subprocess runner instead
+PROCESS_LEVEL_CALLS = {
+    "os._exit", "os.abort", "os.kill", "os.fork", "os.chdir", "os.system",
+    "os.execv", "os.execve", "os.execl", "os.execvp", "os.putenv",
+    "signal.signal", "signal.alarm", "sys.settrace", "sys.setprofile",
+    "threading.settrace", "faulthandler.enable", "input"
+}
+PROCESS_LEVEL_MODULES = {"subprocess", "multiprocessing", "signal", "ctypes"}
+
+
+class ScriptTimeout(BaseException):
+    """Raised inside a script thread once its deadline passes.
+
+    Derives from BaseException so a script's broad `except Exception` cannot swallow it.
+    """
+
+
+def _dotted_name(node):
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if isinstance(node, ast.Name):
+        parts.append(node.id)
+        return ".".join(reversed(parts))
+    return None
+
+
+def uses_process_level_features(tree):
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call) and _dotted_name(node.func) in PROCESS_LEVEL_CALLS:
+            return True
+        if isinstance(node, ast.Import) and any(a.name.split(".")[0] in PROCESS_LEVEL_MODULES for a in node.names):
+            return True
+        if isinstance(node, ast.ImportFrom) and (node.module or "").split(".")[0] in PROCESS_LEVEL_MODULES:
+            return True
+    return False
+
+
+class _ThreadRoutedStream(io.TextIOBase):
+    """sys.stdout/sys.stderr replacement that sends writes from script threads to per-test buffers"""
+
+    def __init__(self, original, local, attr):
+        self.original = original
+        self.local = local
+        self.attr = attr
+
+    def _target(self):
+        return getattr(self.local, self.attr, None) or self.original
+
+    def write(self, text):
+        return self._target().write(text)
+
+    def flush(self):
+        self._target().flush()
+
+    def isatty(self):
+        return False
+
+    @property
+    def encoding(self):
+        return getattr(self.original, "encoding", "utf-8")
+
+
+class _ThreadRoutedArgv(list):
+    """sys.argv replacement that shows script threads their own argv"""
+
+    def __init__(self, original, local):
+        super().__init__(original)
+        self.original = original
+        self.local = local
+
+    def _target(self):
+        argv = getattr(self.local, "argv", None)
+        return self.original if argv is None else argv
+
+    def __getitem__(self, index):
+        return self._target()[index]
+
+    def __len__(self):
+        return len(self._target())
+
+    def __iter__(self):
+        return iter(self._target())
+
+    def __contains__(self, value):
+        return value in self._target()
+
+    def __repr__(self):
+        return repr(self._target())
+
+
+class InProcessRunner:
+    """Run generated test scripts inside this interpreter on worker threads.
+
+    Each script is compiled once and executed as __main__ in a fresh namespace,
+    with __file__ and sys.argv[0] set to its path. stdout, stderr and logging
+    output at INFO and above are captured per test. sys.exit is
+    mapped to an exit code the same way the subprocess runner sees it.
+    Timeouts are cooperative: the deadline is checked on every call and line
+    executed by the script and inside time.sleep, which also covers Selenium's
+    WebDriverWait polling.
+
+    The stream, argv, logging and time.sleep hooks are only installed while at
+    least one script is running and are removed again afterwards. Meanwhile the
+    root logger is lowered to INFO, as the scripts' own logging.basicConfig
+    calls would, while its existing handlers keep dropping records below the
+    level it had before.
+    """
+
+    def __init__(self, timeout=30, grace_period=5, max_abandoned=2, logger=None):
+        self.timeout = timeout
+        self.grace_period = grace_period
+        self.max_abandoned = max_abandoned
+        self.logger = logger or logging.getLogger(__name__)
+        self.abandoned = 0
+        self._compiled = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._active = 0
+        self._restore = None
+
+    @property
+    def enabled(self):
+        return self.abandoned < self.max_abandoned
+
+    def compile(self, script):
+        """Return the cached code object for script, or None when it must run in a subprocess"""
+        key = hashlib.sha256(script.encode("utf-8")).hexdigest()
+        with self._lock:
+            if key in self._compiled:
+                return self._compiled[key]
+        try:
+            tree = ast.parse(script, filename=SCRIPT_FILENAME)
+            code = None if uses_process_level_features(tree) else compile(tree, SCRIPT_FILENAME, "exec")
+        except SyntaxError:
+            code = None  # Let the subprocess runner report the syntax error as usual
+        with self._lock:
+            self._compiled[key] = code
+        return code
+
+    def can_run(self, script):
+        return self.enabled and self.compile(script) is not None
+
+    def _install(self):
+        """Route process-wide streams, logging and time.sleep through per-thread state while scripts run"""
+        with self._lock:
+            self._active += 1
+            if self._active > 1:
+                return
+            original_stdout, original_stderr = sys.stdout, sys.stderr
+            sys.stdout = _ThreadRoutedStream(original_stdout, self._local, "stdout")
+            sys.stderr = _ThreadRoutedStream(original_stderr, self._local, "stderr")
+            original_argv = sys.argv
+            sys.argv = _ThreadRoutedArgv(original_argv, self._local)
+            local = self._local
+
+            def in_script(record):
+                return getattr(local, "stdout", None) is not None
+
+            # Generated scripts call logging.basicConfig(level=logging.INFO), which is a
+            # no-op once the root logger has a handler. Apply its level here, keep the
+            # existing handlers at the previous level, and write script threads'
+            # records to the routed stdout.
+            root = logging.getLogger()
+            root_level = root.level
+            handlers = list(root.handlers)
+
+            def previous_level(record):
+                return record.levelno >= root_level
+
+            for existing in handlers:
+                existing.addFilter(previous_level)
+            handler = logging.StreamHandler(sys.stdout)
+            handler.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(message)s"))
+            handler.addFilter(in_script)
+            root.addHandler(handler)
+            if root_level > logging.INFO:
+                root.setLevel(logging.INFO)
+
+            original_sleep = time.sleep
+
+            def cooperative_sleep(seconds):
+                deadline = getattr(local, "deadline", None)
+                if deadline is None:
+                    return original_sleep(seconds)
+                end = time.monotonic() + seconds
+                while True:
+                    now = time.monotonic()
+                    if now >= deadline:
+                        raise ScriptTimeout()
+                    if now >= end:
+                        return
+                    original_sleep(min(end, deadline) - now)
+
+            time.sleep = cooperative_sleep
+
+            def restore():
+                sys.stdout, sys.stderr = original_stdout, original_stderr
+                sys.argv = original_argv
+                root.removeHandler(handler)
+                root.setLevel(root_level)
+                for existing in handlers:
+                    existing.removeFilter(previous_level)
+                time.sleep = original_sleep
+
+            self._restore = restore
+
+    def _uninstall(self):
+        """Undo _install once the last running script has finished"""
+        with self._lock:
+            self._active -= 1
+            if self._active == 0 and self._restore:
+                self._restore()
+                self._restore = None
+
+    def _tracer(self, deadline):
+        def check(frame, event, arg):
+            if time.monotonic() >= deadline:
+                raise ScriptTimeout()
+            # Only trace lines of the script itself; library code is checked per call
+            return check if frame.f_code.co_filename == SCRIPT_FILENAME else None
+        return check
+
+    def _execute(self, code, state):
+        self._local.stdout = state["stdout"]
+        self._local.stderr = state["stderr"]
+        self._local.deadline = state["deadline"]
+        self._local.argv = [state["path"]]
+        sys.settrace(self._tracer(state["deadline"]))
+        try:
+            exec(code, {"__name__": "__main__", "__file__": state["path"], "__builtins__": builtins})
+            state["returncode"] = 0
+        except SystemExit as e:
+            if e.code is None or isinstance(e.code, int):
+                state["returncode"] = e.code or 0
+            else:
+                state["stderr"].write(f"{e.code}\n")
+                state["returncode"] = 1
+        except ScriptTimeout:
+            state["timed_out"] = True
+        except BaseException:
+            traceback.print_exc(file=state["stderr"])
+            state["returncode"] = 1
+        finally:
+            sys.settrace(None)
+            self._local.deadline = None
+            self._local.argv = None
+            self._local.stdout = None
+            self._local.stderr = None
+
+    def run(self, script, path=SCRIPT_FILENAME):
+        """Execute script as if run from path and return a result dict shaped like the subprocess runner's"""
+        code = self.compile(script)
+        self._install()
+        state = {
+            "stdout": io.StringIO(),
+            "stderr": io.StringIO(),
+            "deadline": time.monotonic() + self.timeout,
+            "path": path,
+            "returncode": None,
+            "timed_out": False
+        }
+        try:
+            thread = threading.Thread(target=self._execute, args=(code, state), name="inprocess-script", daemon=True)
+            thread.start()
+            thread.join(self.timeout + self.grace_period)
+        finally:
+            self._uninstall()
+
+        if thread.is_alive():
+            # Blocked somewhere the deadline checks cannot reach; give up on the thread
+            with self._lock:
+                self.abandoned += 1
+            self.logger.warning(f"In-process script did not stop after timeout ({self.abandoned} abandoned)")
+            if not self.enabled:
+                self.logger.warning("Too many abandoned scripts; falling back to subprocess execution")
+            return {'success': False, 'error': 'Test execution timed out', 'runner': 'in-process'}
+
+        if state["timed_out"]:
+            return {'success': False, 'error': 'Test execution timed out',
+                    'output': state["stdout"].getvalue(), 'runner': 'in-process'}
+        return {
+            'success': state["returncode"] == 0,
+            'output': state["stdout"].getvalue(),
+            'error': state["stderr"].getvalue(),
+            'runner': 'in-process'
+        }
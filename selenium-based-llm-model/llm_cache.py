@@ -0,0 +1,162 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+CACHE_MODES = ("use", "refresh", "off")
+
+
+def sha256(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """Persistent content-addressed cache of LLM responses with LRU size eviction and TTLs.
+
+    Entries are JSON files named by the hash of (provider, model, temperature,
+    system prompt, user prompt hash). A file's mtime records its last use, so
+    eviction removes the least recently used entries first.
+
+    mode="use" reads and writes, "refresh" skips reads but stores fresh
+    responses, "off" bypasses the cache completely.
+    """
+
+    def __init__(self, directory=".llm_cache", max_size_mb=200, ttl_hours=168, mode="use"):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unsupported cache mode: {mode}")
+        self.directory = directory
+        self.max_bytes = int(max_size_mb * 1024 * 1024) if max_size_mb else 0
+        self.ttl_seconds = ttl_hours * 3600 if ttl_hours else 0
+        self.mode = mode
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "writes": 0, "expired": 0, "evictions": 0}
+        self._size = None
+
+    @classmethod
+    def from_config(cls, config, mode="use"):
+        config = config or {}
+        if not config.get("enabled", True):
+            mode = "off"
+        return cls(
+            directory=config.get("directory", ".llm_cache"),
+            max_size_mb=config.get("max_size_mb", 200),
+            ttl_hours=config.get("ttl_hours", 168),
+            mode=mode
+        )
+
+    @staticmethod
+    def make_key(provider, model, temperature, system_prompt, user_prompt):
+        material = json.dumps({
+            "provider": provider,
+            "model": model,
+            "temperature": temperature,
+            "system_prompt": system_prompt,
+            "user_prompt_sha256": sha256(user_prompt)
+        }, sort_keys=True)
+        return sha256(material)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, key):
+        """Return the cached response for key, or None on a miss"""
+        if self.mode != "use":
+            if self.mode == "refresh":
+                self._count("misses")
+            return None
+
+        path = self._path(key)
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            self._count("misses")
+            return None
+
+        if self.ttl_seconds and time.time() - entry.get("created", 0) > self.ttl_seconds:
+            self._remove(path)
+            self._count("expired")
+            self._count("misses")
+            return None
+
+        try:
+            os.utime(path)  # Mark as recently used for LRU eviction
+        except OSError:
+            pass
+        self._count("hits")
+        return entry["content"]
+
+    def put(self, key, content, **metadata):
+        if self.mode == "off":
+            return
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        entry = {"created": time.time(), "content": content, **metadata}
+        with self._lock:
+            self._ensure_size()
+
+        # Write atomically so concurrent readers never see a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(entry, f)
+        previous = os.path.getsize(path) if os.path.exists(path) else 0
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._stats["writes"] += 1
+            self._size += os.path.getsize(path) - previous
+        self._evict()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0
+        stats["mode"] = self.mode
+        return stats
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _entries(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(".json"):
+                    path = os.path.join(root, name)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    yield path, st.st_size, st.st_mtime
+
+    def _ensure_size(self):
+        if self._size is None:
+            self._size = sum(size for _, size, _ in self._entries())
+
+    def _remove(self, path):
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except OSError:
+            return
+        with self._lock:
+            if self._size is not None:
+                self._size -= size
+
+    def _evict(self):
+        with self._lock:
+            if not self.max_bytes or self._size <= self.max_bytes:
+                return
+            entries = sorted(self._entries(), key=lambda e: e[2])
+            for path, size, _ in entries:
+                if self._size <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                self._size -= size
+                self._stats["evictions"] += 1
@@ -0,0 +1,104 @@
+import logging
+import threading
+import time
+
+# Environment variables holding each provider's API key
+API_KEY_ENV = {
+    "openai": "OPENAI_API_KEY",
+    "groq": "GROQ_API_KEY",
+    "google-gemini": "GOOGLE_API_KEY",
+    "anthropic": "ANTHROPIC_API_KEY"
+}
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))], 3)
+
+
+class LLMRouter:
+    """Map each call type to an ordered list of provider/model targets.
+
+    A route is looked up by call site first (e.g. "_requires_login"), then by
+    model type ("analysis" or "selenium"). Without a routing section the single
+    model_provider/model_settings pair from llm_config.yaml is used, as before.
+
+    Targets that fail max_failures times in a row are skipped for
+    cooldown_seconds, so a provider that is down or timing out stops costing
+    every request a failed attempt first. A target with a fallback behind it
+    gets only retries_before_failover retries, and none for timeouts.
+    """
+
+    def __init__(self, config, logger=None):
+        self.config = config
+        self.routes = config.get("routing") or {}
+        settings = self.routes.get("failover", {})
+        self.max_failures = settings.get("max_failures", 3)
+        self.cooldown_seconds = settings.get("cooldown_seconds", 120)
+        self.retries_before_failover = settings.get("retries_before_failover", 1)
+        self.logger = logger or logging.getLogger(__name__)
+        self._health = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def _default_target(self, model_type):
+        provider = self.config["model_provider"]
+        params = self.config["model_settings"].get(provider, {})
+        return {"provider": provider, "model": params[f"{model_type}_model"]}
+
+    def route(self, call_site, model_type):
+        """Return (route name, ordered targets); healthy targets come before cooling-down ones"""
+        name = call_site if call_site in self.routes else model_type
+        targets = self.routes.get(name) or [self._default_target(model_type)]
+        if name not in self.routes:
+            name = f"{model_type} (default)"
+
+        now = time.monotonic()
+        with self._lock:
+            healthy = [t for t in targets if self._health.get(self.label(t), {}).get("until", 0) <= now]
+        # Never leave a call without a target: fall back to the cooling-down ones last
+        return name, healthy + [t for t in targets if t not in healthy]
+
+    def temperature(self, target):
+        if "temperature" in target:
+            return target["temperature"]
+        return self.config["model_settings"].get(target["provider"], {}).get("temperature", 0.2)
+
+    @staticmethod
+    def label(target):
+        return f"{target['provider']}/{target['model']}"
+
+    def record(self, route, target, latency, ok, failover=False):
+        label = self.label(target)
+        with self._lock:
+            stats = self._stats.setdefault(route, {}).setdefault(
+                label, {"attempts": 0, "successes": 0, "failures": 0, "failovers": 0, "latencies": []})
+            stats["attempts"] += 1
+            stats["latencies"].append(latency)
+            if ok:
+                stats["successes"] += 1
+                self._health[label] = {"failures": 0, "until": 0}
+                return
+            stats["failures"] += 1
+            stats["failovers"] += failover
+            health = self._health.setdefault(label, {"failures": 0, "until": 0})
+            health["failures"] += 1
+            if health["failures"] >= self.max_failures:
+                health["until"] = time.monotonic() + self.cooldown_seconds
+                self.logger.warning(f"{label} failed {health['failures']} times in a row; "
+                                    f"skipping it for {self.cooldown_seconds}s")
+
+    def stats(self):
+        report = {}
+        with self._lock:
+            for route, targets in self._stats.items():
+                report[route] = {}
+                for label, stats in targets.items():
+                    latencies = stats["latencies"]
+                    report[route][label] = {
+                        **{key: value for key, value in stats.items() if key != "latencies"},
+                        "latency_mean_seconds": round(sum(latencies) / len(latencies), 3) if latencies else None,
+                        "latency_p50_seconds": _percentile(latencies, 0.5) if latencies else None,
+                        "latency_p95_seconds": _percentile(latencies, 0.95) if latencies else None
+                    }
+        return report
@@ -0,0 +1,238 @@
+import logging
+import random
+import re
+import threading
+import time
+from collections import deque
+
+from retry_after import retry_after_seconds
+
+WINDOW_SECONDS = 60.0
+
+# Exception class names the provider SDKs (openai, groq, google-api-core) use for transient failures
+RETRYABLE_ERRORS = {
+    "RateLimitError", "APIConnectionError", "APITimeoutError", "InternalServerError",
+    "ResourceExhausted", "ServiceUnavailable", "DeadlineExceeded", "TooManyRequests", "OverloadedError"
+}
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504, 529}
+# Transient errors that mean the request was slow rather than refused; retrying them costs a full timeout
+TIMEOUT_ERRORS = {"APITimeoutError", "DeadlineExceeded", "TimeoutError", "ReadTimeout", "TimeoutException"}
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+
+
+def parse_reset(value):
+    """Seconds until a rate limit resets, from values like '1s', '6m0s' or '250ms'"""
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(str(value))
+    if not parts:
+        return None
+    scale = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+    return sum(float(number) * scale[unit] for number, unit in parts)
+
+
+def _headers(source):
+    headers = getattr(source, "headers", None)
+    if headers is None:
+        headers = source if isinstance(source, dict) else {}
+    return {str(name).lower(): value for name, value in dict(headers).items()}
+
+
+def error_response(error):
+    return getattr(error, "response", None)
+
+
+def is_timeout(error):
+    if type(error).__name__ in TIMEOUT_ERRORS:
+        return True
+    status = getattr(error, "status_code", None) or getattr(error_response(error), "status_code", None)
+    return status == 408
+
+
+def is_retryable(error, retry_timeouts=True):
+    if not retry_timeouts and is_timeout(error):
+        return False
+    if type(error).__name__ in RETRYABLE_ERRORS:
+        return True
+    status = getattr(error, "status_code", None) or getattr(error_response(error), "status_code", None)
+    return status in RETRYABLE_STATUS
+
+
+class RateBudget:
+    """Sliding one-minute request and token window for one provider.
+
+    Limits start from config and are tightened by x-ratelimit-* response
+    headers, which also tell us when an exhausted limit resets.
+    """
+
+    def __init__(self, rpm=None, tpm=None, max_concurrent=None):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.slots = threading.BoundedSemaphore(max_concurrent) if max_concurrent else None
+        self._requests = deque()   # timestamps
+        self._tokens = deque()     # [timestamp, tokens]
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _expire(self, now):
+        while self._requests and now - self._requests[0] >= WINDOW_SECONDS:
+            self._requests.popleft()
+        while self._tokens and now - self._tokens[0][0] >= WINDOW_SECONDS:
+            self._tokens.popleft()
+
+    def _wait_time(self, tokens, now):
+        wait = max(0.0, self._blocked_until - now)
+        if self.rpm and len(self._requests) >= self.rpm:
+            wait = max(wait, self._requests[0] + WINDOW_SECONDS - now)
+        if self.tpm and self._tokens:
+            used = sum(count for _, count in self._tokens)
+            # A request larger than the whole budget is let through on an empty window
+            if used + tokens > self.tpm:
+                wait = max(wait, self._tokens[0][0] + WINDOW_SECONDS - now)
+        return wait
+
+    def reserve(self, tokens):
+        """Block until the request fits the budget; returns (reservation, seconds waited)"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._expire(now)
+                wait = self._wait_time(tokens, now)
+                if wait <= 0:
+                    self._requests.append(now)
+                    reservation = [now, tokens]
+                    self._tokens.append(reservation)
+                    return reservation, waited
+            time.sleep(wait)
+            waited += wait
+
+    def settle(self, reservation, tokens):
+        """Replace the estimated token count of a reservation with the actual usage"""
+        with self._lock:
+            reservation[1] = tokens
+
+    def cancel(self, reservation):
+        """Drop the token estimate of a request that failed; the request itself still counts against RPM"""
+        self.settle(reservation, 0)
+
+    def update_from_headers(self, headers):
+        headers = _headers(headers)
+        with self._lock:
+            limit_requests = headers.get("x-ratelimit-limit-requests")
+            limit_tokens = headers.get("x-ratelimit-limit-tokens")
+            if limit_requests and limit_requests.isdigit():
+                self.rpm = min(self.rpm or int(limit_requests), int(limit_requests))
+            if limit_tokens and limit_tokens.isdigit():
+                self.tpm = min(self.tpm or int(limit_tokens), int(limit_tokens))
+
+            for kind in ("requests", "tokens"):
+                remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+                reset = parse_reset(headers.get(f"x-ratelimit-reset-{kind}"))
+                if remaining is not None and str(remaining).strip() == "0" and reset:
+                    self._blocked_until = max(self._blocked_until, time.monotonic() + reset)
+
+    def block_for(self, seconds):
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+
+class LLMRequestScheduler:
+    """Pace LLM calls within per-provider RPM/TPM budgets and retry transient failures.
+
+    Retries use exponential backoff with full jitter, honouring Retry-After
+    when the provider sends one. A backoff also pauses the other callers of
+    the same provider. throttled_seconds is the total time callers waited
+    before sending (pacing and backoff), backoff_seconds the delays scheduled
+    after failures.
+    """
+
+    def __init__(self, config=None, logger=None):
+        config = config or {}
+        self.max_retries = config.get("max_retries", 5)
+        self.base_delay = config.get("base_delay_seconds", 1.0)
+        self.max_delay = config.get("max_delay_seconds", 60.0)
+        self.expected_output_tokens = config.get("expected_output_tokens", 1024)
+        self.provider_limits = config.get("providers", {})
+        self.logger = logger or logging.getLogger(__name__)
+        self._budgets = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def _budget(self, provider):
+        with self._lock:
+            if provider not in self._budgets:
+                limits = self.provider_limits.get(provider, {})
+                self._budgets[provider] = RateBudget(limits.get("rpm"), limits.get("tpm"), limits.get("max_concurrent"))
+                self._stats[provider] = {"requests": 0, "retries": 0, "failures": 0,
+                                         "throttled_seconds": 0.0, "backoff_seconds": 0.0}
+            return self._budgets[provider]
+
+    def _count(self, provider, key, amount=1):
+        with self._lock:
+            stats = self._stats[provider]
+            stats[key] = round(stats[key] + amount, 3) if isinstance(stats[key], float) else stats[key] + amount
+
+    def _backoff(self, attempt, error):
+        response = error_response(error)
+        if response is not None:
+            retry_after = retry_after_seconds({"Retry-After": _headers(response).get("retry-after")})
+            if retry_after is not None:
+                return min(self.max_delay, retry_after)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def call(self, provider, prompt_tokens, invoke, usage=None, headers=None, max_retries=None, retry_timeouts=True):
+        """Run invoke() within provider's budget, retrying transient errors.
+
+        usage(result) and headers(result) extract the actual token count and
+        response headers from a successful result. max_retries overrides the
+        configured retry count, and retry_timeouts=False fails timeouts at once,
+        for callers that have a faster fallback than waiting again.
+        """
+        budget = self._budget(provider)
+        max_retries = self.max_retries if max_retries is None else max_retries
+        attempt = 0
+        while True:
+            reservation, waited = budget.reserve(prompt_tokens + self.expected_output_tokens)
+            if waited:
+                self._count(provider, "throttled_seconds", waited)
+                self.logger.debug(f"Waited {waited:.2f}s for {provider} rate budget")
+            self._count(provider, "requests")
+            if budget.slots:
+                budget.slots.acquire()
+            try:
+                result = invoke()
+            except Exception as e:
+                # A failed request consumed no tokens; leaving the estimate would over-throttle retries
+                budget.cancel(reservation)
+                if not is_retryable(e, retry_timeouts) or attempt >= max_retries:
+                    self._count(provider, "failures")
+                    raise
+                delay = self._backoff(attempt, e)
+                attempt += 1
+                self._count(provider, "retries")
+                self._count(provider, "backoff_seconds", delay)
+                if error_response(e) is not None:
+                    budget.update_from_headers(error_response(e))
+                budget.block_for(delay)
+                self.logger.warning(f"{provider} request failed ({type(e).__name__}: {str(e)[:200]}); "
+                                    f"retry {attempt}/{max_retries} in {delay:.1f}s")
+                continue
+            finally:
+                if budget.slots:
+                    budget.slots.release()
+
+            if usage:
+                budget.settle(reservation, usage(result))
+            if headers:
+                budget.update_from_headers(headers(result) or {})
+            return result
+
+    def stats(self):
+        with self._lock:
+            return {provider: dict(stats) for provider, stats in self._stats.items()}
@@ -0,0 +1,105 @@
+import logging
+import threading
+from contextlib import contextmanager
+
+UNATTRIBUTED = "(no page)"
+
+
+def response_usage(message):
+    """(prompt_tokens, completion_tokens, cached_prompt_tokens) reported by the provider for a LangChain message"""
+    usage = getattr(message, "usage_metadata", None) or {}
+    if usage:
+        cached = (usage.get("input_token_details") or {}).get("cache_read", 0) or 0
+        return usage.get("input_tokens", 0) or 0, usage.get("output_tokens", 0) or 0, cached
+
+    # Older integrations only report usage in the raw response metadata
+    metadata = getattr(message, "response_metadata", None) or {}
+    usage = metadata.get("token_usage") or metadata.get("usage") or {}
+    cached = (usage.get("prompt_tokens_details") or {}).get("cached_tokens", usage.get("cache_read_input_tokens", 0)) or 0
+    return (usage.get("prompt_tokens", usage.get("input_tokens", 0)) or 0,
+            usage.get("completion_tokens", usage.get("output_tokens", 0)) or 0,
+            cached)
+
+
+def _totals():
+    return {"calls": 0, "cache_hits": 0, "prompt_tokens": 0, "cached_prompt_tokens": 0, "cached_token_ratio": 0.0,
+            "completion_tokens": 0, "latency_seconds": 0.0, "failed_calls": 0}
+
+
+def _add(totals, call):
+    totals["calls"] += 1
+    totals["failed_calls"] += call["outcome"] != "ok"
+    totals["cache_hits"] += call["cache"] == "hit"
+    totals["prompt_tokens"] += call["prompt_tokens"]
+    totals["cached_prompt_tokens"] += call["cached_prompt_tokens"]
+    # Share of prompt tokens served from the provider's prefix cache
+    if totals["prompt_tokens"]:
+        totals["cached_token_ratio"] = round(totals["cached_prompt_tokens"] / totals["prompt_tokens"], 3)
+    totals["completion_tokens"] += call["completion_tokens"]
+    totals["latency_seconds"] = round(totals["latency_seconds"] + call["latency_seconds"], 3)
+
+
+class LLMUsageTracker:
+    """Per-call token and latency records, aggregated per call site, page and run.
+
+    The page a call belongs to is taken from a thread-local context set with
+    page(url), so worker threads attribute their calls to the page they are
+    working on.
+    """
+
+    def __init__(self, logger=None):
+        self.logger = logger or logging.getLogger(__name__)
+        self.calls = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._run = _totals()
+
+    @contextmanager
+    def page(self, url):
+        previous = self.current_page()
+        self._local.page = url
+        try:
+            yield
+        finally:
+            self._local.page = previous
+
+    def current_page(self):
+        return getattr(self._local, "page", None)
+
+    def record(self, call_site, model, prompt_tokens, completion_tokens, latency, cache, cached_tokens=0, outcome="ok"):
+        """Record one call; failed and failed-over attempts count towards calls and latency with outcome set"""
+        call = {
+            "call_site": call_site or "unknown",
+            "page": self.current_page(),
+            "model": model,
+            "prompt_tokens": prompt_tokens,
+            "cached_prompt_tokens": cached_tokens,
+            "completion_tokens": completion_tokens,
+            "latency_seconds": round(latency, 3),
+            "cache": cache,
+            "outcome": outcome
+        }
+        with self._lock:
+            self.calls.append(call)
+            _add(self._run, call)
+            run = dict(self._run)
+
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(
+                f"LLM {call['call_site']} [{model}, cache {cache}]: {prompt_tokens} prompt ({cached_tokens} cached) + "
+                f"{completion_tokens} completion tokens in {latency:.2f}s | run so far: {run['calls']} calls, "
+                f"{run['prompt_tokens'] + run['completion_tokens']} tokens, "
+                f"{run['cached_token_ratio']:.0%} of prompt tokens cached, {run['latency_seconds']:.1f}s"
+            )
+        return call
+
+    def summary(self):
+        with self._lock:
+            calls = list(self.calls)
+            run = dict(self._run)
+
+        by_call_site, by_page = {}, {}
+        for call in calls:
+            _add(by_call_site.setdefault(call["call_site"], _totals()), call)
+            _add(by_page.setdefault(call["page"] or UNATTRIBUTED, _totals()), call)
+        return {"run": run, "by_call_site": by_call_site, "by_page": by_page, "calls": calls}
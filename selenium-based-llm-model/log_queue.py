@@ -0,0 +1,51 @@
+import atexit
+import json
+import queue
+from logging.handlers import QueueHandler, QueueListener
+
+
+class LazyJSON:
+    """Log argument that is only serialized if a handler actually formats the record.
+
+    Use with %-style logging, e.g. logger.debug("Metadata: %s", LazyJSON(metadata)),
+    so large payloads cost nothing when DEBUG is disabled.
+    """
+
+    __slots__ = ("value", "indent")
+
+    def __init__(self, value, indent=None):
+        self.value = value
+        self.indent = indent
+
+    def __str__(self):
+        return json.dumps(self.value, indent=self.indent, default=str)
+
+
+def start_queue_logging(logger, handlers):
+    """Attach a QueueHandler to logger and serve handlers from a background listener thread.
+
+    Callers only pay for formatting a record and putting it on an in-memory
+    queue; file and console I/O happen on the listener thread, so concurrent
+    workers no longer serialize on handler locks. The listener is drained and
+    stopped at interpreter exit.
+    """
+    queue_handler = QueueHandler(queue.SimpleQueue())
+    listener = QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+    queue_handler.listener = listener
+    logger.addHandler(queue_handler)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+
+def stop_queue_logging(logger):
+    """Flush and stop the listeners of logger's queue handlers and close their target handlers"""
+    for handler in logger.handlers:
+        listener = getattr(handler, "listener", None)
+        if listener is None:
+            continue
+        atexit.unregister(listener.stop)
+        listener.stop()
+        for target in listener.handlers:
+            target.close()
+        handler.listener = None
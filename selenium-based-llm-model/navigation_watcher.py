@@ -0,0 +1,60 @@
+import json
+import logging
+
+from selenium.common.exceptions import WebDriverException
+
+
+def enable_navigation_events(chrome_options):
+    """Ask chromedriver to buffer CDP Page events in the performance log (network events stay off)"""
+    chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    chrome_options.add_experimental_option("perfLoggingPrefs", {"enableNetwork": False, "enablePage": True})
+
+
+class NavigationWatcher:
+    """Report top-level navigations from Page.frameNavigated events.
+
+    chromedriver buffers the events in the performance log until they are read,
+    so navigations that happen while the generator is busy analyzing a page are
+    not lost. On browsers without the performance log, poll() falls back to
+    reporting changes of current_url.
+    """
+
+    def __init__(self, driver, logger=None):
+        self.driver = driver
+        self.logger = logger or logging.getLogger(__name__)
+        self.available = True
+        self._last_url = None
+
+    def poll(self):
+        """Return URLs navigated to since the last call, oldest first"""
+        if self.available:
+            try:
+                entries = self.driver.get_log("performance")
+            except (WebDriverException, ValueError) as e:
+                self.logger.warning(f"Performance log unavailable, polling current_url instead: {str(e)}")
+                self.available = False
+            else:
+                return self._navigations(entries)
+
+        current_url = self.driver.current_url
+        if current_url != self._last_url:
+            self._last_url = current_url
+            return [current_url]
+        return []
+
+    def _navigations(self, entries):
+        urls = []
+        for entry in entries:
+            try:
+                message = json.loads(entry["message"])["message"]
+            except (KeyError, TypeError, ValueError):
+                continue
+            if message.get("method") != "Page.frameNavigated":
+                continue
+            frame = message.get("params", {}).get("frame", {})
+            if frame.get("parentId"):
+                continue  # iframe navigation
+            url = frame.get("url", "")
+            if url.startswith(("http://", "https://")):
+                urls.append(url + frame.get("urlFragment", ""))
+        return urls
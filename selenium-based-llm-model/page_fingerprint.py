@@ -0,0 +1,100 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from datetime import datetime
+from html.parser import HTMLParser
+
+# Attributes that define page structure; free text is ignored so content-only
+# changes (dates, counters, news items) do not trigger regeneration
+STRUCTURAL_ATTRIBUTES = ("id", "name", "type", "class", "role", "href", "action", "method", "for")
+
+# Static metadata keys holding page text or data volume rather than structure
+CONTENT_KEYS = {"title", "url", "text", "headers", "row_count", "primary_actions"}
+
+
+class _StructureHasher(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.digest = hashlib.sha256()
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        structural = "|".join(f"{name}={attrs[name]}" for name in STRUCTURAL_ATTRIBUTES if attrs.get(name))
+        self.digest.update(f"<{tag} {structural}>".encode("utf-8"))
+
+    def handle_endtag(self, tag):
+        self.digest.update(f"</{tag}>".encode("utf-8"))
+
+
+def structural_metadata(value):
+    """static_metadata with the free-text and content keys removed, recursively"""
+    if isinstance(value, dict):
+        return {key: structural_metadata(item) for key, item in value.items() if key not in CONTENT_KEYS}
+    if isinstance(value, list):
+        return [structural_metadata(item) for item in value]
+    return value
+
+
+def page_fingerprint(page_source, static_metadata):
+    """Structural hash of the compacted DOM combined with the structural parts of the static page metadata"""
+    hasher = _StructureHasher()
+    hasher.feed(page_source)
+    hasher.close()
+    hasher.digest.update(json.dumps(structural_metadata(static_metadata), sort_keys=True, default=str).encode("utf-8"))
+    return hasher.digest.hexdigest()
+
+
+class PageFingerprintStore:
+    """Persistent map of URL -> fingerprint plus the test cases and script files generated for it"""
+
+    def __init__(self, path=".autotest_cache/page_fingerprints.json"):
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            with open(path) as f:
+                self.pages = json.load(f)
+        except (OSError, ValueError):
+            self.pages = {}
+
+    def lookup(self, url, fingerprint):
+        """Previous entry for url if its fingerprint is unchanged, else None"""
+        with self._lock:
+            entry = self.pages.get(url)
+        if entry and entry.get("fingerprint") == fingerprint:
+            return entry
+        return None
+
+    def load_scripts(self, entry):
+        """Read back the saved scripts in test-case order, or None if any file has gone missing"""
+        scripts = []
+        for script_file in entry.get("script_files", []):
+            if not script_file:
+                scripts.append("")  # Generation failed for this test case; the caller regenerates it
+                continue
+            try:
+                with open(script_file) as f:
+                    scripts.append(f.read())
+            except OSError:
+                return None
+        return scripts
+
+    def update(self, url, fingerprint, metadata, test_cases, script_files):
+        with self._lock:
+            self.pages[url] = {
+                "fingerprint": fingerprint,
+                "updated": datetime.now().isoformat(),
+                "metadata": metadata,
+                "test_cases": test_cases,
+                "script_files": script_files
+            }
+            self._save()
+
+    def _save(self):
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(self.pages, f, default=str)
+        os.replace(temp_path, self.path)
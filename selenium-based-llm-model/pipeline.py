@@ -0,0 +1,227 @@
+import logging
+import queue
+import threading
+import time
+
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+from page_fingerprint import page_fingerprint
+from url_extract import URLExtractor
+
+_DONE = object()
+
+DEFAULT_STAGE_WORKERS = {
+    "analysis": 2,
+    "tests": 2,
+    "scripts": 2,
+    "execution": 1
+}
+
+
+class PipelineStage:
+    """A pool of worker threads fed by a bounded queue.
+
+    Each handler result is passed to the next stage. Once every worker has seen
+    the end-of-input marker, the next stage is closed in turn.
+    """
+
+    def __init__(self, name, handler, workers, queue_size, logger):
+        self.name = name
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.input = queue.Queue(maxsize=queue_size)
+        self.next_stage = None
+        self.logger = logger
+        self.processed = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self._lock = threading.Lock()
+        self._running = self.workers
+        self._threads = []
+
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"pipeline-{self.name}-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def put(self, item):
+        # Blocks when the stage is saturated, which back-pressures the stage upstream
+        self.input.put(item)
+
+    def close(self):
+        for _ in range(self.workers):
+            self.input.put(_DONE)
+
+    def join(self):
+        for thread in self._threads:
+            thread.join()
+
+    def _work(self):
+        while True:
+            item = self.input.get()
+            if item is _DONE:
+                break
+            start = time.perf_counter()
+            try:
+                result = self.handler(item)
+            except Exception as e:
+                self.logger.error(f"Pipeline stage '{self.name}' failed: {str(e)}")
+                result = None
+                with self._lock:
+                    self.failed += 1
+            with self._lock:
+                self.processed += 1
+                self.busy_seconds += time.perf_counter() - start
+            if result is not None and self.next_stage:
+                self.next_stage.put(result)
+
+        with self._lock:
+            self._running -= 1
+            last = self._running == 0
+        if last and self.next_stage:
+            self.next_stage.close()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "processed": self.processed,
+                "failed": self.failed,
+                "busy_seconds": round(self.busy_seconds, 2)
+            }
+
+
+class PagePipeline:
+    """Crawl a site and push every page through analysis, test generation,
+    script generation and execution as overlapping stages.
+
+    While scripts for page N execute, LLM calls for page N+1 are already in
+    flight. Analysis workers each own a browser, since a WebDriver session
+    cannot be shared between threads.
+
+    As in single-page mode, a failed script's screenshot shows the browser it
+    ran in; scripts run with --in-process get none.
+    """
+
+    def __init__(self, generator, crawl_depth=1, crawl_backend="browser", crawl_concurrency=1,
+                 crawl_rate=1.0, stage_workers=None, queue_size=4):
+        self.generator = generator
+        self.logger = generator.logger or logging.getLogger(__name__)
+        self.usage = generator.llm.usage
+        self.crawl_depth = crawl_depth
+        self.crawl_backend = crawl_backend
+        self.crawl_concurrency = crawl_concurrency
+        self.crawl_rate = crawl_rate
+        self.stage_workers = {**DEFAULT_STAGE_WORKERS, **(stage_workers or {})}
+        self.queue_size = queue_size
+        self._local = threading.local()
+        self._drivers = []
+        self._drivers_lock = threading.Lock()
+        self.pages = []
+
+        self.stages = [
+            PipelineStage("analysis", self._analyze, self.stage_workers["analysis"], queue_size, self.logger),
+            PipelineStage("tests", self._generate_tests, self.stage_workers["tests"], queue_size, self.logger),
+            PipelineStage("scripts", self._generate_scripts, self.stage_workers["scripts"], queue_size, self.logger),
+            PipelineStage("execution", self._execute, self.stage_workers["execution"], queue_size, self.logger)
+        ]
+        for stage, next_stage in zip(self.stages, self.stages[1:]):
+            stage.next_stage = next_stage
+
+    def _driver(self):
+        driver = getattr(self._local, "driver", None)
+        if driver is None:
+            driver = self.generator.create_browser()
+            self._local.driver = driver
+            with self._drivers_lock:
+                self._drivers.append(driver)
+        return driver
+
+    def _analyze(self, url):
+        driver = self._driver()
+        driver.get(url)
+        WebDriverWait(driver, 10).until(
+            EC.presence_of_element_located((By.TAG_NAME, 'body'))
+        )
+        self.generator.visited_pages.add(url)
+        self.logger.info(f"Analyzing {url} page...")
+        page_source, static_metadata = self.generator.snapshot_page(driver)
+
+        fingerprint = page_fingerprint(page_source, static_metadata)
+        previous = self.generator.reuse_page_analysis(url, fingerprint, page_source)
+        if previous:
+            # Unchanged page: skip straight through generation to execution
+            return {"url": url, **previous}
+
+        with self.usage.page(url):
+            page_metadata = self.generator.enrich_page_metadata(static_metadata, page_source)
+        return {"url": url, "metadata": page_metadata, "page_source": page_source, "fingerprint": fingerprint}
+
+    def _generate_tests(self, page):
+        if not page.get("reused"):
+            with self.usage.page(page["url"]):
+                page["test_cases"] = self.generator.generate_page_specific_tests(page["metadata"], page["page_source"])
+        return page
+
+    def _generate_scripts(self, page):
+        if not page.get("reused"):
+            with self.usage.page(page["url"]):
+                page["scripts"] = self.generator.generate_scripts(page["test_cases"], page["metadata"], page["page_source"])
+            self.generator.record_page_analysis(page["url"], page["fingerprint"], page["metadata"], page["test_cases"])
+        return page
+
+    def _execute(self, page):
+        self.generator.execute_test_cycle(page, url=page["url"])
+        self.pages.append({
+            "url": page["url"],
+            "test_cases": len(page["test_cases"]),
+            "scripts": len([script for script in page["scripts"] if script]),
+            "reused": bool(page.get("reused"))
+        })
+        return None
+
+    def _crawl(self, base_url):
+        analysis = self.stages[0]
+        crawler = URLExtractor(logger=self.logger, backend=self.crawl_backend,
+                               driver_factory=self.generator.create_browser,
+                               http_pool_size=max(10, self.crawl_concurrency))
+        try:
+            if self.crawl_concurrency > 1 and self.crawl_backend == "http":
+                crawler.extract_urls_concurrent(base_url, max_depth=self.crawl_depth,
+                                                concurrency=self.crawl_concurrency,
+                                                rate=self.crawl_rate, on_visit=analysis.put)
+            else:
+                crawler.extract_urls(base_url, max_depth=self.crawl_depth, on_visit=analysis.put)
+        except Exception as e:
+            self.logger.error(f"Pipeline crawl failed: {str(e)}")
+        finally:
+            if crawler.driver:
+                crawler.driver.quit()
+            analysis.close()
+
+    def run(self, base_url):
+        start = time.perf_counter()
+        for stage in self.stages:
+            stage.start()
+        crawl_thread = threading.Thread(target=self._crawl, args=(base_url,), name="pipeline-crawl", daemon=True)
+        crawl_thread.start()
+        try:
+            crawl_thread.join()
+            for stage in self.stages:
+                stage.join()
+        finally:
+            with self._drivers_lock:
+                for driver in self._drivers:
+                    driver.quit()
+                self._drivers = []
+
+        stats = {
+            "wall_seconds": round(time.perf_counter() - start, 2),
+            "pages": self.pages,
+            "stages": {stage.name: stage.stats() for stage in self.stages}
+        }
+        self.logger.info(f"Pipeline finished {len(self.pages)} pages in {stats['wall_seconds']}s")
+        return stats
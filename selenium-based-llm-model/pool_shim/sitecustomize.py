@@ -0,0 +1,78 @@
+"""Hooks for generated test scripts run as subprocesses by WebTestGenerator.
+
+Loaded automatically by Python when this directory is on PYTHONPATH.
+With AUTOTEST_DEBUGGER_ADDRESS set, scripts attach to a warm browser from
+BrowserPool. With AUTOTEST_FAILURE_SCREENSHOT set, a script that has logged
+an error, or is unwinding an exception, saves a screenshot to that path
+when it quits its driver. Does nothing when neither is set.
+"""
+import os
+
+DEBUGGER_ADDRESS = os.environ.get("AUTOTEST_DEBUGGER_ADDRESS")
+CHROMEDRIVER_PATH = os.environ.get("AUTOTEST_CHROMEDRIVER_PATH")
+FAILURE_SCREENSHOT = os.environ.get("AUTOTEST_FAILURE_SCREENSHOT")
+
+
+def _patch():
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.chrome.service import Service
+
+    class PooledChrome(webdriver.Chrome):
+        def __init__(self, options=None, service=None, keep_alive=True):
+            # Chrome is already running, so launch-time switches from the script do not apply
+            pooled_options = Options()
+            pooled_options.debugger_address = DEBUGGER_ADDRESS
+            if options is not None and options.page_load_strategy:
+                pooled_options.page_load_strategy = options.page_load_strategy
+            if service is None or not service.path:
+                service = Service(CHROMEDRIVER_PATH)
+            super().__init__(options=pooled_options, service=service, keep_alive=keep_alive)
+
+    webdriver.Chrome = PooledChrome
+
+    if CHROMEDRIVER_PATH:
+        try:
+            from webdriver_manager.chrome import ChromeDriverManager
+        except ImportError:
+            return
+        ChromeDriverManager.install = lambda self: CHROMEDRIVER_PATH
+
+
+def _capture_failures():
+    import logging
+    import sys
+    from selenium.webdriver.remote.webdriver import WebDriver
+
+    # Generated scripts log "TEST FAILED" at ERROR and quit the driver in a finally block,
+    # so by the time quit() runs the failure is known but the page is still open
+    errors = []
+    record_factory = logging.getLogRecordFactory()
+
+    def tracking_factory(*args, **kwargs):
+        record = record_factory(*args, **kwargs)
+        if record.levelno >= logging.ERROR:
+            errors.append(record.levelno)
+        return record
+
+    logging.setLogRecordFactory(tracking_factory)
+    original_quit = WebDriver.quit
+
+    def quit(self):
+        if errors or sys.exc_info()[0] is not None:
+            try:
+                self.save_screenshot(FAILURE_SCREENSHOT)
+            except Exception:
+                pass  # A dead session has nothing to show
+        original_quit(self)
+
+    WebDriver.quit = quit
+
+
+if DEBUGGER_ADDRESS:
+    _patch()
+if FAILURE_SCREENSHOT:
+    try:
+        _capture_failures()
+    except ImportError:
+        pass
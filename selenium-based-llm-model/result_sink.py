@@ -0,0 +1,96 @@
+import argparse
+import json
+import os
+import threading
+
+# Result fields that carry script output and can grow without bound
+LARGE_FIELDS = ("output", "error")
+
+
+class JSONLResultSink:
+    """Append one compact JSON line per test result as soon as it finishes.
+
+    Output or error text longer than max_field_chars is cut down to its head
+    and tail in the record, with the full text spilled to a side file next to
+    the stream. Each line is flushed on write, so a crash loses at most the
+    record being written, and memory stays flat however many tests run.
+    """
+
+    def __init__(self, path, max_field_chars=4000, fsync=False):
+        self.path = path
+        self.max_field_chars = max_field_chars
+        self.fsync = fsync
+        self.spill_dir = f"{os.path.splitext(path)[0]}_outputs"
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+        self._sequence = 0
+
+    def _truncate(self, sequence, field, text):
+        if not isinstance(text, str) or len(text) <= self.max_field_chars:
+            return text, None
+        os.makedirs(self.spill_dir, exist_ok=True)
+        spill_path = os.path.join(self.spill_dir, f"{sequence:06d}_{field}.txt")
+        with open(spill_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        half = self.max_field_chars // 2
+        omitted = len(text) - 2 * half
+        return f"{text[:half]}\n... [{omitted} characters truncated, full text in {spill_path}] ...\n{text[-half:]}", spill_path
+
+    def write(self, entry):
+        with self._lock:
+            self._sequence += 1
+            sequence = self._sequence
+            result = dict(entry.get("result", {}))
+            for field in LARGE_FIELDS:
+                if field not in result:
+                    continue
+                result[field], spill_path = self._truncate(sequence, field, result.get(field))
+                if spill_path:
+                    result[f"{field}_file"] = spill_path
+            record = {**entry, "seq": sequence, "result": result}
+            self._file.write(json.dumps(record, separators=(",", ":"), default=str) + "\n")
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+
+def iter_results(path):
+    """Yield the records of a result stream; a partial last line from a crash is skipped"""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+def summarize_results(path):
+    """Compute success_rate and per-URL / per-runner summaries in one pass over the stream"""
+    summary = {"results_file": path, "total": 0, "passed": 0, "failed": 0, "success_rate": 0,
+               "by_url": {}, "by_runner": {}, "truncated_outputs": 0}
+    for record in iter_results(path):
+        result = record.get("result", {})
+        passed = bool(result.get("success"))
+        summary["total"] += 1
+        summary["passed" if passed else "failed"] += 1
+        summary["truncated_outputs"] += any(f"{field}_file" in result for field in LARGE_FIELDS)
+        for key, value in (("by_url", record.get("url")), ("by_runner", result.get("runner", "subprocess"))):
+            counts = summary[key].setdefault(value or "unknown", {"total": 0, "passed": 0})
+            counts["total"] += 1
+            counts["passed"] += passed
+    if summary["total"]:
+        summary["success_rate"] = summary["passed"] / summary["total"]
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarize a streamed test result file, e.g. after a crashed run")
+    parser.add_argument("results", help="Path to a test_results_*.jsonl file")
+    args = parser.parse_args()
+    print(json.dumps(summarize_results(args.results), indent=2))
@@ -0,0 +1,239 @@
+import argparse
+import contextlib
+import logging
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id TEXT PRIMARY KEY,
+    started_at TEXT NOT NULL,
+    finished_at TEXT,
+    base_url TEXT,
+    mode TEXT,
+    success_rate REAL,
+    report_file TEXT
+);
+CREATE TABLE IF NOT EXISTS pages (
+    run_id TEXT NOT NULL,
+    url TEXT NOT NULL,
+    path TEXT,
+    fingerprint TEXT,
+    llm_calls INTEGER,
+    prompt_tokens INTEGER,
+    completion_tokens INTEGER,
+    llm_seconds REAL
+);
+CREATE TABLE IF NOT EXISTS test_cases (
+    run_id TEXT NOT NULL,
+    url TEXT NOT NULL,
+    name TEXT NOT NULL,
+    type TEXT,
+    script_file TEXT,
+    reused INTEGER
+);
+CREATE TABLE IF NOT EXISTS executions (
+    run_id TEXT NOT NULL,
+    url TEXT,
+    test_name TEXT,
+    script_file TEXT,
+    success INTEGER NOT NULL,
+    runner TEXT,
+    duration_seconds REAL,
+    executed_at TEXT NOT NULL,
+    error TEXT,
+    screenshot TEXT
+);
+CREATE TABLE IF NOT EXISTS llm_calls (
+    run_id TEXT NOT NULL,
+    url TEXT,
+    call_site TEXT,
+    model TEXT,
+    cache TEXT,
+    prompt_tokens INTEGER,
+    cached_prompt_tokens INTEGER,
+    completion_tokens INTEGER,
+    latency_seconds REAL
+);
+CREATE TABLE IF NOT EXISTS timings (
+    run_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    seconds REAL
+);
+CREATE INDEX IF NOT EXISTS idx_runs_started ON runs (started_at);
+CREATE INDEX IF NOT EXISTS idx_pages_url ON pages (url);
+CREATE INDEX IF NOT EXISTS idx_test_cases_url ON test_cases (url);
+CREATE INDEX IF NOT EXISTS idx_test_cases_name ON test_cases (name);
+CREATE INDEX IF NOT EXISTS idx_executions_url ON executions (url);
+CREATE INDEX IF NOT EXISTS idx_executions_test ON executions (test_name);
+CREATE INDEX IF NOT EXISTS idx_executions_time ON executions (executed_at);
+CREATE INDEX IF NOT EXISTS idx_executions_run ON executions (run_id);
+CREATE INDEX IF NOT EXISTS idx_llm_calls_url ON llm_calls (url);
+"""
+
+_FLUSH = object()
+_STOP = object()
+
+
+class ResultsStore:
+    """SQLite history of runs, pages, test cases, executions and LLM usage.
+
+    Rows are queued and written by a single background thread, which commits
+    them in one transaction per batch_size rows or flush_interval seconds,
+    whichever comes first. add() therefore never waits on disk I/O.
+    """
+
+    def __init__(self, path="autotest_results.db", batch_size=200, flush_interval=1.0, logger=None):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.logger = logger or logging.getLogger(__name__)
+        self.run_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+        self.run = {"id": self.run_id, "started_at": datetime.now().isoformat()}
+        self.started = time.perf_counter()
+        self._queue = queue.Queue()
+        self._flushed = threading.Event()
+        with contextlib.closing(sqlite3.connect(path)) as connection:
+            connection.executescript(SCHEMA)
+            connection.commit()
+        self._thread = threading.Thread(target=self._write_loop, name="results-store", daemon=True)
+        self._thread.start()
+
+    def add(self, table, row):
+        """Queue one row; run_id is filled in"""
+        self._queue.put((table, {"run_id": self.run_id, **row}))
+
+    def update_run(self, **fields):
+        """Insert or replace this run's row with fields merged into it"""
+        self.run.update(fields)
+        self._queue.put(("runs", dict(self.run)))
+
+    def _insert(self, connection, table, columns, rows):
+        verb = "INSERT OR REPLACE" if table == "runs" else "INSERT"
+        sql = f"{verb} INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})"
+        connection.executemany(sql, [tuple(row[column] for column in columns) for row in rows])
+
+    def _commit(self, connection, pending):
+        if not pending:
+            return
+        by_table = {}
+        for table, row in pending:
+            by_table.setdefault((table, tuple(row)), []).append(row)
+        try:
+            with connection:
+                for (table, columns), rows in by_table.items():
+                    self._insert(connection, table, columns, rows)
+        except Exception as e:
+            # One bad row must not cost the rest of the batch; retry each row on its own
+            self.logger.warning(f"Batch of {len(pending)} rows to {self.path} failed ({str(e)}); writing rows one by one")
+            for (table, columns), rows in by_table.items():
+                for row in rows:
+                    try:
+                        with connection:
+                            self._insert(connection, table, columns, [row])
+                    except Exception as e:
+                        self.logger.error(f"Rejected {table} row {row}: {str(e)}")
+        pending.clear()
+
+    def _write_loop(self):
+        connection = sqlite3.connect(self.path)
+        pending = []
+        deadline = time.monotonic() + self.flush_interval
+        try:
+            while True:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    item = None
+                if item is _STOP or item is _FLUSH:
+                    self._commit(connection, pending)
+                    self._flushed.set()
+                    if item is _STOP:
+                        return
+                elif item is not None:
+                    pending.append(item)
+                if len(pending) >= self.batch_size or time.monotonic() >= deadline:
+                    self._commit(connection, pending)
+                    deadline = time.monotonic() + self.flush_interval
+        finally:
+            connection.close()
+
+    def flush(self, timeout=30.0):
+        """Wait until every queued row is committed; False if the writer died or timeout passed"""
+        if not self._thread.is_alive():
+            self.logger.error(f"Results store writer for {self.path} is not running; queued rows are lost")
+            return False
+        self._flushed.clear()
+        self._queue.put(_FLUSH)
+        deadline = time.monotonic() + timeout
+        while not self._flushed.wait(0.5):
+            if not self._thread.is_alive() or time.monotonic() >= deadline:
+                self.logger.error(f"Gave up waiting for the results store {self.path} to flush")
+                return False
+        return True
+
+    def close(self, timeout=30.0):
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                self.logger.error(f"Results store writer for {self.path} did not finish within {timeout}s")
+
+
+QUERIES = {
+    "slowest": ("""
+        SELECT test_name, url, COUNT(*) AS runs, ROUND(AVG(duration_seconds), 2) AS avg_seconds,
+               ROUND(MAX(duration_seconds), 2) AS max_seconds
+        FROM executions WHERE executed_at >= :since AND duration_seconds IS NOT NULL
+        GROUP BY test_name, url ORDER BY avg_seconds DESC LIMIT :limit
+    """, "Tests with the highest average execution time"),
+    "flaky": ("""
+        SELECT test_name, url, COUNT(*) AS runs, SUM(success) AS passed,
+               ROUND(100.0 * SUM(success) / COUNT(*), 1) AS pass_pct
+        FROM executions WHERE executed_at >= :since
+        GROUP BY test_name, url HAVING SUM(success) > 0 AND SUM(success) < COUNT(*)
+        ORDER BY ABS(0.5 - 1.0 * SUM(success) / COUNT(*)), runs DESC LIMIT :limit
+    """, "Tests that both passed and failed, most evenly split first"),
+    "trend": ("""
+        SELECT r.started_at, r.mode, r.base_url, COUNT(e.run_id) AS tests, SUM(e.success) AS passed,
+               ROUND(100.0 * SUM(e.success) / COUNT(e.run_id), 1) AS pass_pct
+        FROM runs r LEFT JOIN executions e ON e.run_id = r.id
+        WHERE r.started_at >= :since
+        GROUP BY r.id ORDER BY r.started_at DESC LIMIT :limit
+    """, "Pass rate per run, newest first"),
+    "regen-cost": ("""
+        SELECT url, COUNT(*) AS analyses, SUM(path != 'reused') AS regenerations,
+               SUM(prompt_tokens + completion_tokens) AS tokens, ROUND(SUM(llm_seconds), 1) AS llm_seconds,
+               ROUND(1.0 * SUM(prompt_tokens + completion_tokens) / MAX(SUM(path != 'reused'), 1)) AS tokens_per_regeneration
+        FROM pages p JOIN runs r ON r.id = p.run_id WHERE r.started_at >= :since
+        GROUP BY url ORDER BY tokens DESC LIMIT :limit
+    """, "LLM cost of (re)generating each page's tests"),
+}
+
+
+def run_query(path, name, limit=20, since="0000"):
+    sql, _ = QUERIES[name]
+    with contextlib.closing(sqlite3.connect(path)) as connection:
+        cursor = connection.execute(sql, {"limit": limit, "since": since})
+        return [column[0] for column in cursor.description], cursor.fetchall()
+
+
+def _print_table(columns, rows):
+    widths = [max(len(str(value)) for value in [column] + [row[i] for row in rows]) for i, column in enumerate(columns)]
+    print("  ".join(str(column).ljust(width) for column, width in zip(columns, widths)))
+    for row in rows:
+        print("  ".join(str(value).ljust(width) for value, width in zip(row, widths)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query the AUTOTEST results database")
+    parser.add_argument("query", choices=sorted(QUERIES), help="; ".join(f"{name}: {doc}" for name, (_, doc) in sorted(QUERIES.items())))
+    parser.add_argument("--db", default="autotest_results.db", help="Results database (default: autotest_results.db)")
+    parser.add_argument("--limit", type=int, default=20, help="Maximum rows to show")
+    parser.add_argument("--since", default="0000", help="Only consider data from this ISO date on, e.g. 2025-01-31")
+    args = parser.parse_args()
+    _print_table(*run_query(args.db, args.query, args.limit, args.since))
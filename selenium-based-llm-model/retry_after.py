@@ -0,0 +1,18 @@
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+
+
+def retry_after_seconds(headers):
+    """Parse a Retry-After header given either in seconds or as an HTTP date"""
+    value = (headers or {}).get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (when - datetime.now(when.tzinfo)).total_seconds())
@@ -0,0 +1,124 @@
+import base64
+import hashlib
+import logging
+import os
+import queue
+import tempfile
+import threading
+from io import BytesIO
+
+_STOP = object()
+
+LLM_FORMATS = {"png": "image/png", "webp": "image/webp", "jpeg": "image/jpeg"}
+
+
+def prepare_for_llm(png, max_width=0, image_format="png", quality=80):
+    """Return (bytes, mime type) of a screenshot sized and encoded for vision input.
+
+    With the defaults the raw PNG from the browser is passed through untouched;
+    it is only decoded when it must be downscaled or converted.
+    """
+    image_format = image_format.lower().replace("jpg", "jpeg")
+    if image_format not in LLM_FORMATS:
+        raise ValueError(f"Unsupported screenshot format: {image_format}")
+    if image_format == "png" and not max_width:
+        return png, LLM_FORMATS["png"]
+    try:
+        from PIL import Image
+    except ImportError:
+        raise RuntimeError("Pillow is required to downscale or convert screenshots")
+
+    img = Image.open(BytesIO(png))
+    if max_width and img.width > max_width:
+        img = img.resize((max_width, round(img.height * max_width / img.width)), Image.LANCZOS)
+    if image_format == "jpeg" and img.mode != "RGB":
+        img = img.convert("RGB")
+    buffered = BytesIO()
+    img.save(buffered, format=image_format.upper(), quality=quality)
+    return buffered.getvalue(), LLM_FORMATS[image_format]
+
+
+def to_base64(data):
+    return base64.b64encode(data).decode()
+
+
+class ScreenshotStore:
+    """Content-addressed screenshot artifacts written on a background thread.
+
+    save() hashes the PNG bytes and returns the artifact path at once; the
+    write happens off the test loop. Identical screenshots share one file.
+    """
+
+    def __init__(self, directory="artifacts/screenshots", logger=None):
+        self.directory = directory
+        self.logger = logger or logging.getLogger(__name__)
+        self._queue = queue.Queue()
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._stats = {"captured": 0, "written": 0, "deduplicated": 0, "bytes_written": 0, "errors": 0}
+        self._thread = None
+
+    def _start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._write_loop, name="screenshot-writer", daemon=True)
+            self._thread.start()
+
+    def path_for(self, digest):
+        return os.path.join(self.directory, digest[:2], f"{digest}.png")
+
+    def save(self, png):
+        """Queue png for writing and return its artifact path"""
+        digest = hashlib.sha256(png).hexdigest()
+        path = self.path_for(digest)
+        with self._lock:
+            self._stats["captured"] += 1
+            if digest in self._pending or os.path.exists(path):
+                self._stats["deduplicated"] += 1
+                return path
+            self._pending.add(digest)
+            self._start()
+        self._queue.put((digest, path, png))
+        return path
+
+    def _write_loop(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is _STOP:
+                    return
+                digest, path, png = item
+                self._write(path, png)
+                with self._lock:
+                    self._pending.discard(digest)
+                    self._stats["written"] += 1
+                    self._stats["bytes_written"] += len(png)
+            except Exception as e:
+                # Any error must not kill the writer, or flush() would wait forever
+                self.logger.error(f"Failed to write screenshot {item[1]}: {str(e)}")
+                with self._lock:
+                    self._pending.discard(item[0])
+                    self._stats["errors"] += 1
+            finally:
+                self._queue.task_done()
+
+    def _write(self, path, png):
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(png)
+        os.replace(temp_path, path)
+
+    def flush(self):
+        """Block until every queued screenshot is on disk"""
+        self._queue.join()
+
+    def close(self):
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join()
+            self._thread = None
+
+    def stats(self):
+        with self._lock:
+            return {"directory": self.directory, **self._stats}
@@ -0,0 +1,166 @@
+import json
+
+
+class StructuredOutputError(ValueError):
+    """The model response could not be turned into JSON matching the schema"""
+
+
+def strip_fences(text):
+    """Drop markdown code fences and any prose before the first JSON bracket"""
+    if "```json" in text:
+        text = text.split("```json", 1)[1]
+    elif "```" in text:
+        text = text.split("```", 1)[1]
+    text = text.split("```", 1)[0] if "```" in text else text
+    starts = [i for i in (text.find("{"), text.find("[")) if i != -1]
+    return text[min(starts):].strip() if starts else text.strip()
+
+
+def _scan(text):
+    """Return (open containers, in_string, index just after the last complete value).
+
+    Each open container is a [bracket, end] pair where text[:end] ends with
+    the container's last complete member.
+    """
+    stack = []
+    in_string = escaped = False
+    last_complete = 0
+    for i, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+                if stack:
+                    last_complete = i + 1
+                    if stack[-1][0] == "[":
+                        stack[-1][1] = i + 1
+            continue
+        if char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append([char, i + 1])
+        elif char in "}]":
+            if stack:
+                stack.pop()
+            last_complete = i + 1
+            if not stack:
+                return stack, False, last_complete
+            stack[-1][1] = i + 1
+        elif char == ",":
+            last_complete = i
+            if stack:
+                stack[-1][1] = i
+        elif not char.isspace() and stack:
+            last_complete = i + 1
+    return stack, in_string, last_complete
+
+
+def _strip_trailing_commas(text):
+    """Remove commas directly before a closing bracket, leaving string contents untouched"""
+    out = []
+    in_string = escaped = False
+    pending_comma = None
+    for char in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+            out.append(char)
+            continue
+        if pending_comma is not None:
+            if char.isspace():
+                pending_comma.append(char)
+                continue
+            if char not in "}]":
+                out.append(",")
+            out.extend(pending_comma[1:])
+            pending_comma = None
+        if char == ",":
+            pending_comma = [","]
+            continue
+        if char == '"':
+            in_string = True
+        out.append(char)
+    if pending_comma is not None:
+        out.extend(pending_comma)
+    return "".join(out)
+
+
+def _close(candidate, stack):
+    closing = "".join("}" if bracket == "{" else "]" for bracket, _ in reversed(stack))
+    return json.loads(_strip_trailing_commas(candidate + closing))
+
+
+def salvage_json(text):
+    """Recover the complete prefix of truncated or slightly malformed JSON.
+
+    Handles the common failure modes of long generations: trailing commas,
+    trailing prose after the document, and output cut off mid-value (the
+    partial trailing element is dropped and open brackets are closed).
+    """
+    text = strip_fences(text)
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+    try:
+        return json.loads(_strip_trailing_commas(text))
+    except ValueError:
+        pass
+
+    stack, in_string, end = _scan(text)
+    if not stack and not in_string:
+        # Complete document followed by trailing text
+        return json.loads(_strip_trailing_commas(text[:end]))
+
+    # Truncated inside an array: keep its complete elements and drop the partial one.
+    # Within an array of objects (e.g. test_cases) the partial element is the whole
+    # object being written, however deeply the cut happened inside it.
+    arrays = [index for index, (bracket, _) in enumerate(stack) if bracket == "["]
+    if arrays:
+        of_objects = [index for index in arrays if index + 1 < len(stack) and stack[index + 1][0] == "{"]
+        array = of_objects[0] if of_objects else arrays[-1]
+        try:
+            return _close(text[:stack[array][1]], stack[:array + 1])
+        except ValueError:
+            pass
+
+    # Otherwise cut back to the last complete value, then close what is open
+    for cut in range(end, 0, -1):
+        candidate = text[:cut].rstrip().rstrip(",").rstrip()
+        if candidate.endswith(":"):
+            continue
+        stack, in_string, _ = _scan(candidate)
+        if in_string:
+            continue
+        try:
+            return _close(candidate, stack)
+        except ValueError:
+            continue
+    raise StructuredOutputError("No salvageable JSON in response")
+
+
+def parse_structured(text, schema):
+    """Parse a model response into JSON and validate it against schema"""
+    # Imported here so that loading this module does not pull in jsonschema at startup
+    from jsonschema import ValidationError, validate
+
+    if isinstance(text, (dict, list)):
+        data = text
+    else:
+        try:
+            data = salvage_json(text)
+        except ValueError as e:
+            raise StructuredOutputError(f"Invalid JSON: {str(e)}") from e
+    try:
+        validate(instance=data, schema=schema)
+    except ValidationError as e:
+        path = "/".join(str(part) for part in e.absolute_path) or "<root>"
+        raise StructuredOutputError(f"Schema violation at {path}: {e.message}") from e
+    return data
@@ -0,0 +1,14 @@
+from structured_output import salvage_json
+
+
+def test_truncated_nested_array_drops_the_partial_test_case():
+    text = '{"test_cases": [{"name": "a", "steps": ["x", "y"]}, {"name": "b", "steps": ["z"'
+    assert salvage_json(text) == {"test_cases": [{"name": "a", "steps": ["x", "y"]}]}
+
+
+def test_truncated_array_of_strings_keeps_complete_items():
+    assert salvage_json('{"steps": ["a", "b", "c') == {"steps": ["a", "b"]}
+
+
+def test_trailing_commas_are_removed_outside_strings_only():
+    assert salvage_json('{"a": "x, ]", "b": [1, 2,],}') == {"a": "x, ]", "b": [1, 2]}
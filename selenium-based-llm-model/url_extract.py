@@ -1,83 +1,451 @@
+import asyncio
+from collections import deque
 from datetime import datetime
+import heapq
+import itertools
+import random
+import threading
 import time
+from html.parser import HTMLParser
 from urllib.parse import urlparse, urljoin
+from urllib.robotparser import RobotFileParser
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
 import logging
 
+from retry_after import retry_after_seconds
+
+_LXML = None
+
+
+def _lxml_html():
+    """lxml.html, or False when it is not installed; imported on the first HTTP-crawled page"""
+    global _LXML
+    if _LXML is None:
+        try:
+            import lxml.html
+            _LXML = lxml.html
+        except ImportError:  # html.parser is used instead
+            _LXML = False
+    return _LXML
+
+# Markers of client-rendered pages whose links only exist after JavaScript runs
+JS_APP_MARKERS = ('id="root"', "id='root'", 'id="app"', "id='app'", "__NEXT_DATA__",
+                  "data-reactroot", "ng-app", "ng-version", "window.__NUXT__")
+
+
+class _LinkParser(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.base_href = None
+        self.hrefs = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "a":
+            href = dict(attrs).get("href")
+            if href:
+                self.hrefs.append(href)
+        elif tag == "base" and self.base_href is None:
+            self.base_href = dict(attrs).get("href")
+
+
+def parse_links(html, page_url):
+    """Return absolute hrefs of all <a> elements, honouring <base href>"""
+    lxml_html = _lxml_html()
+    if lxml_html:
+        try:
+            doc = lxml_html.fromstring(html)
+            base = doc.xpath("//base/@href")
+            base_url = urljoin(page_url, base[0]) if base else page_url
+            return [urljoin(base_url, href) for href in doc.xpath("//a/@href") if href]
+        except (ValueError, lxml_html.etree.ParserError):
+            pass
+    parser = _LinkParser()
+    parser.feed(html)
+    base_url = urljoin(page_url, parser.base_href) if parser.base_href else page_url
+    return [urljoin(base_url, href) for href in parser.hrefs]
+
+
+class HostPoliteness:
+    """Enforce a minimum delay between requests to the same host"""
+
+    def __init__(self, delay=1.0):
+        self.delay = delay
+        self._next_allowed = {}
+        self._lock = threading.Lock()
+
+    def wait(self, url):
+        if not self.delay:
+            return
+        host = urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_allowed.get(host, now))
+            self._next_allowed[host] = slot + self.delay
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class TokenBucket:
+    """Async token bucket allowing `rate` requests per second with bursts of up to `burst`"""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class HTTPFetcher:
+    """Fetch pages over pooled keep-alive HTTP connections"""
+
+    def __init__(self, pool_size=10, timeout=10, user_agent="AUTOTEST-crawler/1.0"):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = user_agent
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def fetch(self, url):
+        """Return (final_url, status_code, content_type, text, headers)"""
+        response = self.session.get(url, timeout=self.timeout)
+        content_type = response.headers.get("Content-Type", "")
+        text = response.text if "html" in content_type else ""
+        return response.url, response.status_code, content_type, text, response.headers
+
+    def close(self):
+        self.session.close()
+
+
+class CrawlFrontier:
+    """URLs waiting to be crawled, with O(1) duplicate checks.
+
+    Every URL is enqueued at most once. By default URLs are visited in FIFO
+    (breadth-first) order; with prioritize=True shallower URLs come first and,
+    within a depth, URLs with a higher score(url). max_urls caps how many
+    distinct URLs may ever be enqueued.
+    """
+
+    def __init__(self, max_urls=None, prioritize=False, score=None):
+        self.max_urls = max_urls
+        self.prioritize = prioritize
+        self.score = score or (lambda url: 0)
+        self._queue = [] if prioritize else deque()
+        self._enqueued = set()
+        self._sequence = itertools.count()
+
+    def push(self, url, depth):
+        """Enqueue url unless it was seen before or the cap is reached; returns True if added"""
+        if url in self._enqueued:
+            return False
+        if self.max_urls is not None and len(self._enqueued) >= self.max_urls:
+            return False
+        self._enqueued.add(url)
+        if self.prioritize:
+            heapq.heappush(self._queue, (depth, -self.score(url), next(self._sequence), url))
+        else:
+            self._queue.append((url, depth))
+        return True
+
+    def pop(self):
+        if self.prioritize:
+            depth, _, _, url = heapq.heappop(self._queue)
+            return url, depth
+        return self._queue.popleft()
+
+    @property
+    def full(self):
+        return self.max_urls is not None and len(self._enqueued) >= self.max_urls
+
+    def __len__(self):
+        return len(self._queue)
+
+
 class URLExtractor:
-    def __init__(self, driver, logger=None):
+    """Breadth-first crawler collecting internal URLs.
+
+    backend="browser" loads every page in Selenium. backend="http" fetches pages
+    over HTTP and parses links directly, only loading a page in the browser
+    when it looks client-rendered.
+    """
+
+    def __init__(self, driver=None, logger=None, backend="browser", politeness_delay=1.0,
+                 driver_factory=None, min_static_links=3, http_pool_size=10):
+        if backend not in ("browser", "http"):
+            raise ValueError(f"Unsupported crawl backend: {backend}")
         self.driver = driver
+        self.driver_factory = driver_factory
         self.logger = logger or logging.getLogger(__name__)
-        
-    def extract_urls(self, base_url, max_depth=2):
-        """Recursively extract unique internal URLs with BFS up to max_depth"""
-        self.logger.info(f"Starting recursive URL extraction from: {base_url}")
-        
+        self.backend = backend
+        self.politeness = HostPoliteness(politeness_delay)
+        self.min_static_links = min_static_links
+        self.http = HTTPFetcher(pool_size=http_pool_size) if backend == "http" else None
+        self.stats = {"http_pages": 0, "browser_pages": 0, "retries": 0}
+
+    def _browser(self):
+        if self.driver is None:
+            if self.driver_factory is None:
+                raise RuntimeError("Browser fallback needed but no driver or driver_factory was given")
+            self.driver = self.driver_factory()
+        return self.driver
+
+    def _needs_browser(self, html, links):
+        if len(links) >= self.min_static_links:
+            return False
+        return not links or any(marker in html for marker in JS_APP_MARKERS)
+
+    def _http_page(self, url):
+        """Return (status, headers, links); links is None when the page needs JavaScript rendering"""
+        final_url, status, content_type, html, headers = self.http.fetch(url)
+        if status >= 400:
+            return status, headers, []
+        if "html" not in content_type:
+            return status, headers, []
+        links = parse_links(html, final_url)
+        if self._needs_browser(html, links):
+            self.logger.debug(f"{url} looks client-rendered, falling back to the browser")
+            return status, headers, None
+        return status, headers, links
+
+    def _http_links(self, url):
+        """Links found over plain HTTP, or None when the page needs JavaScript rendering"""
+        self.politeness.wait(url)
+        status, _, links = self._http_page(url)
+        if status >= 400:
+            raise RuntimeError(f"HTTP {status}")
+        if links is not None:
+            self.stats["http_pages"] += 1
+        return links
+
+    def _browser_links(self, url):
+        self.politeness.wait(url)
+        driver = self._browser()
+        driver.get(url)
+        WebDriverWait(driver, 10).until(
+            EC.presence_of_element_located((By.TAG_NAME, 'body'))
+        )
+        self.stats["browser_pages"] += 1
+        # One round trip for all hrefs instead of a get_attribute call per link
+        return driver.execute_script(
+            "return Array.prototype.map.call(document.querySelectorAll('a[href]'), function (a) { return a.href; });"
+        ) or []
+
+    def _page_links(self, url):
+        if self.backend == "http":
+            links = self._http_links(url)
+            if links is not None:
+                return links
+        return self._browser_links(url)
+
+    def normalize_url(self, href, current_url, base_domain):
+        """Absolute URL without query/fragment and trailing slash, or None if external"""
+        parsed_url = urlparse(urljoin(current_url, href))
+        if parsed_url.netloc != base_domain:
+            return None
+        # Normalize path and handle root URL
+        path = parsed_url.path.rstrip('/') or '/'
+        return f"{parsed_url.scheme}://{parsed_url.netloc}{path}"
+
+    def _enqueue_links(self, frontier, links, current_url, depth, base_domain, normalized):
+        """Add discovered URLs to the frontier, which drops anything already enqueued"""
+        added = 0
+        for href in links:
+            if not href:
+                continue
+            if href in normalized:
+                clean_url = normalized[href]
+            else:
+                clean_url = self.normalize_url(href, current_url, base_domain)
+                if "://" in href:
+                    normalized[href] = clean_url
+            if clean_url and frontier.push(clean_url, depth + 1):
+                added += 1
+        return added
+
+    def extract_urls(self, base_url, max_depth=2, max_urls=None, prioritize=False, score=None, on_visit=None):
+        """Recursively extract unique internal URLs with BFS up to max_depth
+
+        on_visit(url) is called as soon as each page has been crawled, so
+        callers can start work on it before the crawl finishes.
+        """
+        self.logger.info(f"Starting recursive URL extraction from: {base_url} ({self.backend} backend)")
+
         try:
             parsed_base = urlparse(base_url)
             base_domain = parsed_base.netloc
             visited = set()
-            to_visit = [(base_url, 0)]  # (url, depth)
-
-            while to_visit:
-                current_url, depth = to_visit.pop(0)
-                
-                if current_url in visited or depth > max_depth:
-                    continue
-                
+            frontier = CrawlFrontier(max_urls=max_urls, prioritize=prioritize, score=score)
+            frontier.push(base_url, 0)
+            # Absolute hrefs (nav menus, footers) repeat on every page; normalize each once
+            normalized = {}
+
+            while frontier:
+                current_url, depth = frontier.pop()
+
                 try:
-                    self.logger.debug(f"Waiting 1 sec. before processing {current_url}")
-                    time.sleep(1)
-                    self.driver.get(current_url)
-                    WebDriverWait(self.driver, 10).until(
-                        EC.presence_of_element_located((By.TAG_NAME, 'body'))
-                    )
+                    links = self._page_links(current_url)
                     visited.add(current_url)
                     self.logger.info(f"Processing depth {depth}: {current_url}")
+                    if on_visit:
+                        on_visit(current_url)
+
+                    if depth >= max_depth:
+                        continue
 
-                    # Extract links from current page
-                    links = self.driver.find_elements(By.TAG_NAME, 'a')
-                    new_urls = set()
-
-                    for link in links:
-                        href = link.get_attribute('href')
-                        if not href:
-                            continue
-                            
-                        full_url = urljoin(current_url, href)
-                        parsed_url = urlparse(full_url)
-                        
-                        if parsed_url.netloc == base_domain:
-                            # Normalize path and handle root URL
-                            path = parsed_url.path.rstrip('/') or '/'
-                            #clean_url = f"{parsed_url.scheme}://{parsed_url.netloc}{parsed_url.path}".rstrip('/')
-                            clean_url = f"{parsed_url.scheme}://{parsed_url.netloc}{path}"
-                            if clean_url not in visited:
-                                new_urls.add(clean_url)
-
-                    # Add discovered URLs to queue
-                    for url in new_urls:
-                        if url not in [u for u, _ in to_visit]:
-                            to_visit.append((url, depth + 1))
-                            
-                    self.logger.debug(f"Found {len(new_urls)} new URLs at depth {depth}")
+                    added = self._enqueue_links(frontier, links, current_url, depth, base_domain, normalized)
+                    self.logger.debug(f"Found {added} new URLs at depth {depth}")
 
                 except Exception as e:
                     self.logger.error(f"Failed to process {current_url}: {str(e)}")
 
-            self.logger.info(f"Total unique URLs found: {len(visited)}")
+            if frontier.full:
+                self.logger.warning(f"URL cap of {max_urls} reached; remaining links were not enqueued")
+            self.logger.info(f"Total unique URLs found: {len(visited)} "
+                             f"({self.stats['http_pages']} over HTTP, {self.stats['browser_pages']} in browser)")
 
             for url in visited:
                 self.logger.debug(f"Found URL: {url}")
 
             return sorted(visited)
-            
+
         except Exception as e:
             self.logger.error(f"URL extraction failed: {str(e)}")
             return []
 
+    def extract_urls_concurrent(self, base_url, max_depth=2, concurrency=8, rate=1.0,
+                                max_urls=None, prioritize=False, score=None, max_retries=3, on_visit=None):
+        """Crawl like extract_urls with up to `concurrency` fetches in flight.
+
+        Each host gets a token bucket of `rate` requests per second, slowed
+        further by any robots.txt Crawl-delay. URLs disallowed by robots.txt are
+        skipped. 429 and 5xx responses are retried with exponential backoff,
+        honouring Retry-After. Requires the http backend.
+        """
+        if self.backend != "http":
+            raise ValueError("Concurrent crawling requires the http backend")
+        return asyncio.run(self._crawl_async(base_url, max_depth, concurrency, rate,
+                                             max_urls, prioritize, score, max_retries, on_visit))
+
+    def _load_robots(self, base_url):
+        parsed = urlparse(base_url)
+        robots = RobotFileParser(f"{parsed.scheme}://{parsed.netloc}/robots.txt")
+        try:
+            response = self.http.session.get(robots.url, timeout=self.http.timeout)
+            if response.status_code in (401, 403):
+                robots.disallow_all = True
+            elif response.status_code >= 400:
+                robots.allow_all = True
+            else:
+                robots.parse(response.text.splitlines())
+        except Exception as e:
+            self.logger.debug(f"Could not load {robots.url}: {str(e)}")
+            robots.allow_all = True
+        return robots
+
+    async def _fetch_with_backoff(self, url, bucket, max_retries):
+        for attempt in range(max_retries + 1):
+            await bucket.acquire()
+            status, headers, links = await asyncio.to_thread(self._http_page, url)
+            if status != 429 and status < 500:
+                break
+            if attempt == max_retries:
+                break
+            delay = retry_after_seconds(headers)
+            if delay is None:
+                delay = min(60.0, 2 ** attempt) + random.uniform(0, 1)
+            self.stats["retries"] += 1
+            self.logger.debug(f"HTTP {status} for {url}; retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+        if status >= 400:
+            raise RuntimeError(f"HTTP {status}")
+        return links
+
+    async def _crawl_async(self, base_url, max_depth, concurrency, rate, max_urls, prioritize, score, max_retries,
+                           on_visit):
+        self.logger.info(f"Starting concurrent URL extraction from: {base_url} "
+                         f"(concurrency {concurrency}, {rate} req/s per host)")
+        base_domain = urlparse(base_url).netloc
+        robots = await asyncio.to_thread(self._load_robots, base_url)
+        user_agent = self.http.session.headers["User-Agent"]
+        crawl_delay = robots.crawl_delay(user_agent)
+        if crawl_delay:
+            rate = min(rate, 1.0 / float(crawl_delay))
+            self.logger.info(f"Honouring robots.txt Crawl-delay of {crawl_delay}s ({rate:.2f} req/s)")
+        # Every crawled URL is on base_domain, so a single bucket covers the per-host limit
+        bucket = TokenBucket(rate)
+        browser_lock = asyncio.Lock()
+
+        visited = set()
+        normalized = {}
+        frontier = CrawlFrontier(max_urls=max_urls, prioritize=prioritize, score=score)
+        frontier.push(base_url, 0)
+        condition = asyncio.Condition()
+        in_flight = 0
+
+        async def process(url, depth):
+            if not robots.can_fetch(user_agent, url):
+                self.logger.debug(f"Skipping {url}: disallowed by robots.txt")
+                return []
+            links = await self._fetch_with_backoff(url, bucket, max_retries)
+            if links is None:
+                # The browser is a single shared session, so renders are serialized
+                async with browser_lock:
+                    links = await asyncio.to_thread(self._browser_links, url)
+            else:
+                self.stats["http_pages"] += 1
+            visited.add(url)
+            self.logger.info(f"Processing depth {depth}: {url}")
+            if on_visit:
+                # The callback may block (e.g. a bounded pipeline queue); keep the event loop running meanwhile
+                await asyncio.to_thread(on_visit, url)
+            return links if depth < max_depth else []
+
+        async def worker():
+            nonlocal in_flight
+            while True:
+                async with condition:
+                    while not frontier and in_flight:
+                        await condition.wait()
+                    if not frontier:
+                        return
+                    url, depth = frontier.pop()
+                    in_flight += 1
+                links = []
+                try:
+                    links = await process(url, depth)
+                except Exception as e:
+                    self.logger.error(f"Failed to process {url}: {str(e)}")
+                finally:
+                    async with condition:
+                        self._enqueue_links(frontier, links, url, depth, base_domain, normalized)
+                        in_flight -= 1
+                        condition.notify_all()
+
+        await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+
+        if frontier.full:
+            self.logger.warning(f"URL cap of {max_urls} reached; remaining links were not enqueued")
+        self.logger.info(f"Total unique URLs found: {len(visited)} ({self.stats['http_pages']} over HTTP, "
+                         f"{self.stats['browser_pages']} in browser, {self.stats['retries']} retries)")
+        return sorted(visited)
+
 if __name__ == "__main__":
     import argparse
     from selenium import webdriver
@@ -88,11 +456,21 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="URL Extraction Utility")
     parser.add_argument("--url", required=True, help="Base URL to start extraction from")
     parser.add_argument("--depth", type=int, default=1, help="Maximum recursion depth (default: 1)")
-    parser.add_argument("--loglevel", default="INFO", 
+    parser.add_argument("--backend", default="browser", choices=["browser", "http"],
+                        help="Fetch pages in the browser, or over HTTP with browser fallback for JS pages")
+    parser.add_argument("--delay", type=float, default=1.0,
+                        help="Minimum seconds between requests to the same host (default: 1.0)")
+    parser.add_argument("--concurrency", type=int, default=1,
+                        help="Fetches in flight at once; above 1 crawls asynchronously (http backend only)")
+    parser.add_argument("--rate", type=float, default=1.0,
+                        help="Requests per second per host for concurrent crawls (default: 1.0)")
+    parser.add_argument("--loglevel", default="INFO",
                         choices=["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"],
                         help="Set logging level")
 
     args = parser.parse_args()
+    if args.concurrency > 1 and args.backend != "http":
+        parser.error("--concurrency requires --backend http")
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     log_file = f"url_extraction_{timestamp}.log"
 
@@ -106,21 +484,28 @@ if __name__ == "__main__":
         ]
     )
 
-    # Initialize browser
-    chrome_options = Options()
-    chrome_options.add_argument("--headless")
-    chrome_options.add_argument("--window-size=1920,1080")
-    driver = webdriver.Chrome(service=Service(), options=chrome_options)
+    # Initialize browser on first use; the HTTP backend may never need it
+    def create_driver():
+        chrome_options = Options()
+        chrome_options.add_argument("--headless")
+        chrome_options.add_argument("--window-size=1920,1080")
+        return webdriver.Chrome(service=Service(), options=chrome_options)
 
+    extractor = URLExtractor(backend=args.backend, politeness_delay=args.delay, driver_factory=create_driver,
+                             http_pool_size=max(10, args.concurrency))
     try:
-        extractor = URLExtractor(driver)
-        urls = extractor.extract_urls(args.url, max_depth=args.depth)
-        
+        if args.concurrency > 1:
+            urls = extractor.extract_urls_concurrent(args.url, max_depth=args.depth,
+                                                     concurrency=args.concurrency, rate=args.rate)
+        else:
+            urls = extractor.extract_urls(args.url, max_depth=args.depth)
+
         print("\n" + "="*50)
         print(f"Extracted {len(urls)} URLs from {args.url}:")
         for url in urls:
             print(f" - {url}")
         print("="*50)
-        
+
     finally:
-        driver.quit()
+        if extractor.driver:
+            extractor.driver.quit()